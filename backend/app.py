@@ -2,10 +2,22 @@
 from flask import Flask, jsonify, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from models import db
+from models import db, Product, FarmerRating, FarmerRatingStats, Order, OrderItem, SalesDaily, Package, Upload
 from config import Config
 from utils import ensure_directory_exists
+from search import init_search_index
+from geo import init_geo_index, resolve_location
+from rating_stats import rebuild_rating_stats
+from sales_rollup import rebuild_sales_daily
+from suggest import suggestion_index
+from fuzzy import trigram_index
+from leaderboard import leaderboard
+from reservations import start_sweeper
+from outbox import start_workers
+import order_events  # Registers the outbox handlers for order events
 import os
+import threading
+from datetime import datetime
 from sqlalchemy import inspect, text
 
 # Import blueprints
@@ -15,6 +27,9 @@ from routes.admin import admin_bp
 from routes.farmers import farmers_bp
 from routes.delivery import delivery_bp
 from routes.orders import orders_bp
+from routes.uploads import uploads_bp, sweep_expired_uploads
+from routes.exports import exports_bp
+from routes.cart import cart_bp
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
@@ -45,6 +60,9 @@ app.register_blueprint(admin_bp)
 app.register_blueprint(farmers_bp)
 app.register_blueprint(delivery_bp)
 app.register_blueprint(orders_bp)
+app.register_blueprint(uploads_bp)
+app.register_blueprint(exports_bp)
+app.register_blueprint(cart_bp)
 
 # Database initialization and migration
 with app.app_context():
@@ -63,13 +81,115 @@ with app.app_context():
                     conn.execute(text('ALTER TABLE farmer_applications ADD COLUMN certification_filename VARCHAR(255)'))
                 print("✓ Added certification_filename column to farmer_applications table")
         
+        # Add updated_at column to products if it doesn't exist (migration)
+        product_columns = [col['name'] for col in inspector.get_columns('products')]
+        if 'updated_at' not in product_columns:
+            with db.engine.begin() as conn:
+                conn.execute(text('ALTER TABLE products ADD COLUMN updated_at DATETIME'))
+                conn.execute(text('UPDATE products SET updated_at = created_at'))
+            print("✓ Added updated_at column to products table")
+        
+        # Add coordinate columns to products and geocode existing locations (migration)
+        if 'latitude' not in product_columns:
+            with db.engine.begin() as conn:
+                conn.execute(text('ALTER TABLE products ADD COLUMN latitude FLOAT'))
+                conn.execute(text('ALTER TABLE products ADD COLUMN longitude FLOAT'))
+                locations = conn.execute(text('SELECT DISTINCT location FROM products WHERE location IS NOT NULL')).scalars().all()
+                for location in locations:
+                    coordinates = resolve_location(location)
+                    if coordinates:
+                        conn.execute(
+                            text('UPDATE products SET latitude = :lat, longitude = :lon WHERE location = :location'),
+                            {'lat': coordinates[0], 'lon': coordinates[1], 'location': location}
+                        )
+            print("✓ Added latitude/longitude columns to products table")
+        
+        # Link packages to the orders they were dispatched for (migration)
+        package_columns = [col['name'] for col in inspector.get_columns('packages')]
+        if 'order_id' not in package_columns:
+            with db.engine.begin() as conn:
+                conn.execute(text('ALTER TABLE packages ADD COLUMN order_id INTEGER REFERENCES orders(id)'))
+            print("✓ Added order_id column to packages table")
+        
+        # Expire unfinished uploads and track anonymous uploaders (migration)
+        upload_columns = [col['name'] for col in inspector.get_columns('uploads')]
+        if 'expires_at' not in upload_columns:
+            with db.engine.begin() as conn:
+                conn.execute(text('ALTER TABLE uploads ADD COLUMN expires_at DATETIME'))
+                conn.execute(text('ALTER TABLE uploads ADD COLUMN client_ip VARCHAR(45)'))
+                conn.execute(
+                    text("UPDATE uploads SET expires_at = :expires_at WHERE status = 'pending'"),
+                    {'expires_at': datetime.utcnow() + Config.UPLOAD_PENDING_TTL}
+                )
+            print("✓ Added expires_at/client_ip columns to uploads table")
+        
+        # Add catalogue, rating, order, package and upload indexes to existing tables (create_all only indexes new tables)
+        with db.engine.begin() as conn:
+            for model in (Product, FarmerRating, Order, OrderItem, Package, Upload):
+                for index in model.__table__.indexes:
+                    index.create(bind=conn, checkfirst=True)
+        
         # Check if farmer_ratings table exists, create if not
         table_names = inspector.get_table_names()
         if 'farmer_ratings' not in table_names:
             # Table will be created by db.create_all() above
             print("✓ Created farmer_ratings table")
+        
+        # Populate rating aggregates for ratings written before farmer_rating_stats existed
+        if not FarmerRatingStats.query.first() and FarmerRating.query.first():
+            count = rebuild_rating_stats()
+            db.session.commit()
+            print(f"✓ Built farmer_rating_stats for {count} farmer(s)")
+        
+        # Backfill the daily sales rollup for orders placed before sales_daily existed
+        if not SalesDaily.query.first() and Order.query.first():
+            count = rebuild_sales_daily()
+            db.session.commit()
+            print(f"✓ Built sales_daily ({count} row(s))")
     except Exception as e:
         print(f"Migration note: {e}")
+    
+    # Full-text search index over products (kept in sync by SQLite triggers)
+    init_search_index(db.engine)
+    
+    # Spatial index over product coordinates for "near me" queries (also trigger-synced)
+    init_geo_index(db.engine)
+    
+    # The in-memory structures below are per process: each server process builds its own here
+    # and then only sees the product, order and rating writes made through its own requests
+    
+    # In-memory typeahead and fuzzy-match indexes (updated incrementally by the product and order routes)
+    suggestion_index.build()
+    trigram_index.build()
+    
+    # Precomputed farmer leaderboard (re-ranked incrementally by the rating and product routes)
+    leaderboard.build()
+
+_background_tasks_lock = threading.Lock()
+_background_tasks_started = False
+
+def start_background_tasks():
+    """Start the sweeper and outbox threads the web app relies on (once per process)"""
+    global _background_tasks_started
+    with _background_tasks_lock:
+        if _background_tasks_started:
+            return
+        _background_tasks_started = True
+    
+    # Periodically delete lapsed cart reservations and abandoned uploads in bulk
+    start_sweeper(app, extra_sweeps=[('expired unfinished upload(s)', sweep_expired_uploads)])
+    
+    # Drain the outbox in background threads (set OUTBOX_WORKERS=0 to run outbox_worker.py instead)
+    if not start_workers(app):
+        print("⚠ OUTBOX_WORKERS=0: order notifications and dispatch only run while outbox_worker.py is running")
+
+@app.before_request
+def ensure_background_tasks():
+    # Started by the first request rather than on import: this works the same under flask run,
+    # python app.py (the reloader's watcher process never serves) and gunicorn (after the fork),
+    # while scripts that import `app` never get the threads
+    if app.config['BACKGROUND_TASKS'] and not _background_tasks_started:
+        start_background_tasks()
 
 # Legacy/test routes (can be removed later if not needed)
 @app.route("/test")
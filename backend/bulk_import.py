@@ -0,0 +1,143 @@
+"""Streaming bulk product import from CSV or NDJSON"""
+import csv
+import io
+import json
+import math
+from sqlalchemy import insert
+from models import db, Product
+from config import Config
+from http_cache import bump_version
+from suggest import suggestion_index
+from fuzzy import trigram_index
+from leaderboard import leaderboard
+from geo import resolve_coordinates
+
+FORMATS = ('csv', 'ndjson')
+
+def _iter_csv(text_stream):
+    reader = csv.DictReader(text_stream)
+    for row in reader:
+        # line_num is the last physical line read, which copes with quoted newlines
+        yield reader.line_num, row, None
+
+def _iter_ndjson(text_stream):
+    for line_no, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Each line must be a JSON object"
+            continue
+        yield line_no, row, None
+
+def validate_row(row: dict, farmer_id: int) -> tuple:
+    """Return (values for the products insert, None) or (None, error message)"""
+    name = str(row.get('name') or '').strip()
+    if not name:
+        return None, "name is required"
+    
+    try:
+        price = float(row.get('price'))
+        quantity = float(row.get('quantity'))
+    except (TypeError, ValueError):
+        return None, "price and quantity must be numbers"
+    
+    if not math.isfinite(price) or not math.isfinite(quantity):
+        return None, "price and quantity must be finite numbers"
+    
+    if price < 0 or quantity <= 0:
+        return None, "price must be >= 0 and quantity must be > 0"
+    
+    location = str(row.get('location') or '').strip()[:200]
+    try:
+        coordinates = resolve_coordinates(location, row.get('latitude'), row.get('longitude'))
+    except (TypeError, ValueError):
+        return None, "latitude and longitude must be valid coordinates"
+    latitude, longitude = coordinates or (None, None)
+    
+    return {
+        'farmer_id': farmer_id,
+        'name': name[:200],
+        'description': str(row.get('description') or ''),
+        'price': price,
+        'quantity': quantity,
+        'unit': str(row.get('unit') or 'kg').strip()[:20],
+        'category': str(row.get('category') or '').strip()[:100],
+        'location': location,
+        'latitude': latitude,
+        'longitude': longitude,
+        'is_available': True
+    }, None
+
+def import_products(farmer_id: int, binary_stream, fmt: str) -> dict:
+    """
+    Read rows one at a time from the uploaded file and insert valid ones in
+    batches of IMPORT_BATCH_SIZE, one multi-row INSERT and one commit per batch.
+    A bad row is reported and skipped; it never aborts the rows around it.
+    """
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    rows = _iter_csv(text_stream) if fmt == 'csv' else _iter_ndjson(text_stream)
+    
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+    
+    def record_error(line_no, message):
+        nonlocal failed
+        failed += 1
+        if len(errors) < Config.IMPORT_MAX_ERRORS:
+            errors.append({'line': line_no, 'error': message})
+    
+    def flush():
+        nonlocal imported
+        if not batch:
+            return
+        inserted = db.session.execute(
+            insert(Product).returning(Product.id, Product.farmer_id, Product.name, Product.category,
+                                      Product.location, Product.is_available),
+            batch
+        ).all()
+        bump_version('products')
+        db.session.commit()
+        
+        for product in inserted:
+            suggestion_index.add_product(product)
+            trigram_index.add_product(product)
+            leaderboard.add_product(product)
+        imported += len(inserted)
+        batch.clear()
+    
+    try:
+        for line_no, row, error in rows:
+            if imported + failed + len(batch) >= Config.IMPORT_MAX_ROWS:
+                record_error(line_no, f"Row limit of {Config.IMPORT_MAX_ROWS} reached; remaining rows skipped")
+                break
+            
+            if error is None:
+                values, error = validate_row(row, farmer_id)
+            if error:
+                record_error(line_no, error)
+                continue
+            
+            batch.append(values)
+            if len(batch) >= Config.IMPORT_BATCH_SIZE:
+                flush()
+        flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The file is unreadable past this point; batches already committed stay imported
+        db.session.rollback()
+        record_error(None, f"Could not read file: {e}")
+    finally:
+        text_stream.detach()
+    
+    return {
+        'imported': imported,
+        'failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors)
+    }
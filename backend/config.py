@@ -4,10 +4,27 @@ from datetime import timedelta
 
 class Config:
     """Base configuration"""
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///database.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    IDEMPOTENCY_KEY_TTL = timedelta(hours=24)  # How long a stored response is replayed
+    IDEMPOTENCY_LOCK_TIMEOUT = timedelta(seconds=60)  # After this an unfinished attempt is presumed dead
+    IDEMPOTENCY_WAIT_SECONDS = 10  # How long a duplicate waits for the in-flight request
+    CART_HOLD_TTL = timedelta(minutes=15)  # Cart reservations lapse this long after the cart was last changed
+    BACKGROUND_TASKS = os.environ.get('BACKGROUND_TASKS', '1') != '0'  # Sweeper and outbox threads in the serving process
+    RESERVATION_SWEEP_INTERVAL = 60  # Seconds between bulk deletes of lapsed reservations
+    OUTBOX_WORKERS = int(os.environ.get('OUTBOX_WORKERS', 2))  # In-app outbox threads; 0 when outbox_worker.py runs instead
+    OUTBOX_BATCH_SIZE = 100  # Events claimed per worker round trip
+    OUTBOX_POLL_INTERVAL = 1  # Seconds an idle worker waits before polling again
+    OUTBOX_MAX_ATTEMPTS = 8  # After this many failures an event is parked as 'failed'
+    OUTBOX_RETRY_BASE_SECONDS = 5  # Retry delay doubles from this per failed attempt
+    OUTBOX_RETRY_MAX_SECONDS = 3600
+    OUTBOX_LOCK_TIMEOUT = timedelta(minutes=5)  # A claimed event not finished by then is reclaimed
+    OUTBOX_RETENTION = timedelta(days=7)  # Processed events are purged after this
+    DISPATCH_BATCH_SIZE = 200  # Completed orders turned into packages per dispatch round
+    TRACKING_NUMBER_PREFIX = 'BIO'  # Dispatch tracking numbers (seed data uses 'TRK')
+    TRACKING_NUMBER_KEY = os.environ.get('TRACKING_NUMBER_KEY', 'change-this-tracking-key-in-production')
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-for-sessions-change-in-production')
     SESSION_COOKIE_SAMESITE = 'Lax'
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
@@ -16,5 +33,37 @@ class Config:
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'pdf'}
+    ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # Part size for resumable uploads
+    CHUNKED_UPLOAD_MAX_SIZE = 64 * 1024 * 1024  # Largest file accepted through resumable uploads
+    UPLOAD_PENDING_TTL = timedelta(hours=24)  # An unfinished upload is discarded this long after its last part
+    ANONYMOUS_PENDING_UPLOADS_MAX = 3  # Unfinished uploads one client IP may hold without logging in
     VALID_USER_TYPES = ['farmer', 'transporter', 'user', 'admin']
+    IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # For content-addressed files
+    PHOTO_VARIANTS = {'thumb': 160, 'card': 480, 'full': 1600}  # Bounding box (px) per photo size
+    PHOTO_VARIANT_QUALITY = 82  # JPEG quality for resized photos
+    PHOTO_VARIANT_WORKERS = 2  # Background threads generating photo variants
+    PRODUCTS_PAGE_SIZE = 20  # Default page size for the product catalogue
+    PRODUCTS_MAX_PAGE_SIZE = 100  # Upper bound for the `limit` query parameter
+    PRODUCT_FRAGMENT_CACHE_BYTES = 16 * 1024 * 1024  # Memory cap for cached product JSON
+    IMPORT_BATCH_SIZE = 1000  # Rows per INSERT/commit during bulk product import
+    IMPORT_MAX_ROWS = 100000
+    IMPORT_MAX_ERRORS = 100  # Per-row errors reported back (the rest are only counted)
+    EXPORT_BATCH_SIZE = 1000  # Rows fetched per round trip while streaming exports
+    PRICE_FACET_BUCKETS = [0, 1, 5, 10, 25, 50, 100]  # Lower edges of the price histogram buckets
+    RATINGS_PAGE_SIZE = 20  # Default page size for a farmer's ratings
+    RATINGS_MAX_PAGE_SIZE = 100
+    FARMER_RATINGS_BATCH_MAX = 200  # Farmer ids accepted by one /api/farmers/ratings request
+    ORDERS_PAGE_SIZE = 20  # Default page size for a buyer's order history
+    ORDERS_MAX_PAGE_SIZE = 100
+    SALES_DEFAULT_DAYS = 30  # Window for farmer sales analytics without `from`
+    SALES_MAX_DAYS = 366
+    LEADERBOARD_DEFAULT_LIMIT = 10
+    LEADERBOARD_MAX_LIMIT = 100
+    SEARCH_DEFAULT_LIMIT = 20
+    SEARCH_MAX_LIMIT = 100
+    SUGGEST_DEFAULT_LIMIT = 8
+    SUGGEST_MAX_LIMIT = 20
+    GEO_DEFAULT_RADIUS_KM = 25  # Radius for `near` product queries without `radius`
+    GEO_MAX_RADIUS_KM = 500
 
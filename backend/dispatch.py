@@ -0,0 +1,85 @@
+"""Dispatch: turn completed orders into packages and share them out between transporters"""
+import hashlib
+import heapq
+from sqlalchemy import and_, func
+from sqlalchemy.orm import joinedload
+from models import db, User, Order, Package
+from config import Config
+
+# Package statuses that still need a transporter's time
+OPEN_STATUSES = ('pending', 'picked_up', 'in_transit')
+FEISTEL_ROUNDS = 4
+MAX_ORDER_ID = 2 ** 32 - 1
+
+def _round(value: int, i: int) -> int:
+    digest = hashlib.blake2b(
+        f"{i}:{value}".encode(), key=Config.TRACKING_NUMBER_KEY.encode()[:64], digest_size=2
+    ).digest()
+    return int.from_bytes(digest, 'big')
+
+def _permute(order_id: int) -> int:
+    """
+    Keyed bijection on 32-bit integers (a small Feistel network): distinct
+    order ids always map to distinct values, and the result doesn't reveal
+    how many orders there are.
+    """
+    left, right = order_id >> 16, order_id & 0xFFFF
+    for i in range(FEISTEL_ROUNDS):
+        left, right = right, left ^ _round(right, i)
+    return (left << 16) | right
+
+def tracking_number(order_id: int) -> str:
+    """Tracking number for an order's package, unique by construction (no lookups or retries)"""
+    if not 0 < order_id <= MAX_ORDER_ID:
+        raise ValueError(f"Order id {order_id} is outside the tracking number range")
+    return f"{Config.TRACKING_NUMBER_PREFIX}{_permute(order_id):010d}"
+
+def transporter_workloads() -> list:
+    """(open packages, transporter_id) for every active transporter, from one aggregate query"""
+    rows = db.session.query(User.id, func.count(Package.id)) \
+        .outerjoin(Package, and_(Package.transporter_id == User.id, Package.status.in_(OPEN_STATUSES))) \
+        .filter(User.user_type == 'transporter', User.is_active == True) \
+        .group_by(User.id)
+    return [(open_packages, transporter_id) for transporter_id, open_packages in rows]
+
+def dispatch_orders(order_ids=None, limit: int = None) -> list:
+    """
+    Create packages for completed orders that don't have one yet (the given
+    orders, or the oldest DISPATCH_BATCH_SIZE by default) and assign each to
+    the transporter with the fewest open packages. Workloads are read once for
+    the whole batch and kept in a min-heap as packages are handed out.
+    Orders that already have a package are skipped, so it is safe to run again.
+    The packages are flushed but not committed; raises LookupError if there
+    are orders but no active transporters.
+    """
+    query = Order.query.options(joinedload(Order.user)) \
+        .outerjoin(Package, Package.order_id == Order.id) \
+        .filter(Order.status == 'completed', Package.id.is_(None))
+    if order_ids is not None:
+        query = query.filter(Order.id.in_(list(order_ids)))
+    orders = query.order_by(Order.id).limit(limit or Config.DISPATCH_BATCH_SIZE).all()
+    if not orders:
+        return []
+    
+    workloads = transporter_workloads()
+    if not workloads:
+        raise LookupError("No active transporters to assign packages to")
+    heapq.heapify(workloads)
+    
+    packages = []
+    for order in orders:
+        open_packages, transporter_id = heapq.heappop(workloads)
+        packages.append(Package(
+            order_id=order.id,
+            transporter_id=transporter_id,
+            recipient_name=order.user.username if order.user else f"Order #{order.id}",
+            # Checkout doesn't collect a delivery address yet; the transporter confirms it with the buyer
+            recipient_address=f"To be confirmed with buyer ({order.user.email})" if order.user else "To be confirmed",
+            status='pending',
+            tracking_number=tracking_number(order.id)
+        ))
+        heapq.heappush(workloads, (open_packages + 1, transporter_id))
+    
+    db.session.add_all(packages)
+    db.session.flush()
+    return packages
@@ -0,0 +1,79 @@
+"""LRU cache of pre-encoded product JSON fragments for list endpoints"""
+import json
+import threading
+from collections import OrderedDict
+from config import Config
+
+# Rough per-entry bookkeeping cost (key, tuple, OrderedDict node) on top of the bytes
+_ENTRY_OVERHEAD = 128
+
+class FragmentCache:
+    """
+    Maps product id -> (version, encoded JSON bytes). The version is the
+    product's `updated_at`, so any write to a product misses the stale entry;
+    entries are evicted least-recently-used once `max_bytes` is exceeded.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def fragments_by_id(self, rows, loader) -> dict:
+        """
+        Return {product id: encoded fragment} for rows (anything with `.id`
+        and `.updated_at`). Misses are fetched in one call to `loader(ids)`,
+        which must return Product objects; ids it doesn't return are left out.
+        """
+        found = {}
+        with self._lock:
+            for row in rows:
+                entry = self._entries.get(row.id)
+                if entry and entry[0] == row.updated_at:
+                    self._entries.move_to_end(row.id)
+                    found[row.id] = entry[1]
+        
+        missing = [row.id for row in rows if row.id not in found]
+        if missing:
+            for product in loader(missing):
+                encoded = json.dumps(product.to_dict(), separators=(',', ':')).encode('utf-8')
+                self._store(product.id, product.updated_at, encoded)
+                found[product.id] = encoded
+        
+        return found
+    
+    def invalidate(self, product_id: int):
+        """Drop a product's fragment, e.g. after its quantity or availability changed"""
+        with self._lock:
+            entry = self._entries.pop(product_id, None)
+            if entry:
+                self._size -= len(entry[1]) + _ENTRY_OVERHEAD
+    
+    def _store(self, product_id, version, encoded):
+        with self._lock:
+            previous = self._entries.pop(product_id, None)
+            if previous:
+                self._size -= len(previous[1]) + _ENTRY_OVERHEAD
+            
+            self._entries[product_id] = (version, encoded)
+            self._size += len(encoded) + _ENTRY_OVERHEAD
+            
+            while self._size > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted) + _ENTRY_OVERHEAD
+
+def splice_json(envelope: dict, key: str, fragments: list) -> bytes:
+    """Encode `envelope` with `key` set to a JSON array of already-encoded fragments"""
+    head = json.dumps(envelope, separators=(',', ':')).encode('utf-8')[:-1]
+    separator = b',' if envelope else b''
+    return head + separator + json.dumps(key).encode('utf-8') + b':[' + b','.join(fragments) + b']}'
+
+def splice_fields(fragment: bytes, fields: dict) -> bytes:
+    """Add `fields` to an encoded JSON object without decoding it"""
+    if not fields:
+        return fragment
+    return fragment[:-1] + b',' + json.dumps(fields, separators=(',', ':')).encode('utf-8')[1:]
+
+# Fragments shared by the product list, nearby and search endpoints
+product_fragments = FragmentCache(Config.PRODUCT_FRAGMENT_CACHE_BYTES)
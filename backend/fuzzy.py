@@ -0,0 +1,106 @@
+"""Typo-tolerant product name matching backed by an in-memory trigram index"""
+import math
+import re
+import threading
+from models import db, Product
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Minimum share of the query's trigrams a name must contain to count as a match
+DEFAULT_THRESHOLD = 0.5
+
+def trigrams(value: str) -> frozenset:
+    """pg_trgm-style trigrams: each word padded with two leading spaces and one trailing"""
+    grams = set()
+    for word in _WORD_RE.findall((value or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+class TrigramIndex:
+    """
+    Inverted index from trigram to the ids of available products whose name
+    contains it. Lookups only visit the rarest posting lists a match could
+    possibly appear in (prefix filtering), then score the surviving candidates.
+    """
+    
+    def __init__(self):
+        self._postings = {}  # trigram -> set of product ids
+        self._names = {}     # product_id -> trigram set of its name
+        self._lock = threading.Lock()
+    
+    def build(self):
+        """(Re)build the index from all available products"""
+        postings = {}
+        names = {}
+        rows = db.session.query(Product.id, Product.name).filter(Product.is_available == True)
+        for product_id, name in rows:
+            grams = trigrams(name)
+            names[product_id] = grams
+            for gram in grams:
+                postings.setdefault(gram, set()).add(product_id)
+        
+        with self._lock:
+            self._postings = postings
+            self._names = names
+    
+    def add_product(self, product):
+        """Index a product (replacing any previous entry for it)"""
+        self.remove_product(product.id)
+        if not product.is_available:
+            return
+        
+        grams = trigrams(product.name)
+        with self._lock:
+            self._names[product.id] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(product.id)
+    
+    def remove_product(self, product_id: int):
+        """Drop a product, e.g. once it sells out"""
+        with self._lock:
+            grams = self._names.pop(product_id, None)
+            for gram in grams or ():
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(product_id)
+                    if not posting:
+                        del self._postings[gram]
+    
+    def search(self, query: str, limit: int, threshold: float = DEFAULT_THRESHOLD) -> list:
+        """
+        Return up to `limit` (product_id, score) pairs, best first.
+        Score is the share of the query's trigrams found in the name; ties go to
+        the name with the higher Jaccard similarity (fewer extra trigrams).
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        
+        # A match must share at least `min_shared` trigrams with the query, so it
+        # must appear in at least one of the (n - min_shared + 1) rarest lists.
+        min_shared = max(1, math.ceil(threshold * len(query_grams)))
+        
+        with self._lock:
+            lists = sorted(
+                (self._postings.get(gram, ()) for gram in query_grams),
+                key=len
+            )
+            candidates = set()
+            for posting in lists[:len(query_grams) - min_shared + 1]:
+                candidates.update(posting)
+            
+            scored = []
+            for product_id in candidates:
+                name_grams = self._names[product_id]
+                shared = len(query_grams & name_grams)
+                if shared < min_shared:
+                    continue
+                jaccard = shared / (len(query_grams) + len(name_grams) - shared)
+                scored.append((shared / len(query_grams), jaccard, product_id))
+        
+        scored.sort(reverse=True)
+        return [(product_id, round(score, 3)) for score, _, product_id in scored[:limit]]
+
+# Trigram postings for the names of available products, used by fuzzy search
+trigram_index = TrigramIndex()
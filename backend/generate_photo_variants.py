@@ -0,0 +1,37 @@
+"""
+Script to generate resized photo variants (thumb, card, full) for existing products.
+New uploads get their variants automatically; run this once for photos uploaded before that.
+
+Usage:
+    python generate_photo_variants.py
+"""
+
+import sys
+import os
+
+# Add the current directory to the path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from models import Product
+from images import Image, generate_variants
+
+def generate_all_variants():
+    """Generate variants for every product photo"""
+    if Image is None:
+        print("❌ Pillow is not installed. Run: pip install -r requirements.txt")
+        return False
+    
+    with app.app_context():
+        products = Product.query.filter(Product.photo_filename.isnot(None)).all()
+        print(f"Generating variants for {len(products)} product photos...")
+        
+        for product in products:
+            written = generate_variants(product.photo_filename)
+            print(f"- {product.name}: {', '.join(written) if written else 'skipped'}")
+        
+        print("✅ Done!")
+        return True
+
+if __name__ == "__main__":
+    generate_all_variants()
@@ -0,0 +1,202 @@
+"""Product coordinates: offline gazetteer lookup and an SQLite R*Tree spatial index"""
+import csv
+import math
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from sqlalchemy import column, select, table, text
+from sqlalchemy.exc import OperationalError
+from models import Product
+
+GEO_TABLE = 'products_geo'
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.csv')
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+# Set by init_geo_index(); False means R*Tree is unavailable and queries filter on the columns instead
+rtree_enabled = False
+
+_geo = table(GEO_TABLE, column('id'), column('min_lat'), column('max_lat'), column('min_lon'), column('max_lon'))
+
+# The index holds a point box for every available product with coordinates,
+# so sold-out and unlocated rows never take part in a "near me" query.
+_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_geo_ai AFTER INSERT ON products
+    WHEN new.is_available AND new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO {GEO_TABLE}(id, min_lat, max_lat, min_lon, max_lon)
+        VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_geo_ad AFTER DELETE ON products BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_geo_au
+    AFTER UPDATE OF latitude, longitude, is_available ON products BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+        INSERT INTO {GEO_TABLE}(id, min_lat, max_lat, min_lon, max_lon)
+        SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.is_available AND new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END
+    ''',
+]
+
+def init_geo_index(engine) -> bool:
+    """
+    Create the R*Tree table and its sync triggers if missing, populating it from
+    existing available products on first creation. Returns whether R*Tree is usable.
+    """
+    global rtree_enabled
+    
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': GEO_TABLE}
+            ).first()
+            
+            if not exists:
+                conn.execute(text(f"CREATE VIRTUAL TABLE {GEO_TABLE} USING rtree(id, min_lat, max_lat, min_lon, max_lon)"))
+                conn.execute(text(
+                    f"INSERT INTO {GEO_TABLE}(id, min_lat, max_lat, min_lon, max_lon) "
+                    "SELECT id, latitude, latitude, longitude, longitude FROM products "
+                    "WHERE is_available AND latitude IS NOT NULL AND longitude IS NOT NULL"
+                ))
+                print(f"✓ Created {GEO_TABLE} spatial index")
+            
+            for trigger in _TRIGGERS:
+                conn.execute(text(trigger))
+        
+        rtree_enabled = True
+    except OperationalError as e:
+        print(f"R*Tree unavailable, falling back to bounding-box column filters: {e}")
+        rtree_enabled = False
+    
+    return rtree_enabled
+
+def _normalize(name: str) -> str:
+    """Lowercase, strip accents and collapse punctuation, so 'Béjaïa' and 'bejaia' match"""
+    stripped = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(c for c in stripped if not unicodedata.combining(c))
+    return _NON_ALNUM_RE.sub(' ', stripped.lower()).strip()
+
+@lru_cache(maxsize=1)
+def _gazetteer() -> dict:
+    """Normalized place name -> (latitude, longitude), read once from the bundled CSV"""
+    places = {}
+    try:
+        with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                places[_normalize(row['name'])] = (float(row['latitude']), float(row['longitude']))
+    except OSError as e:
+        print(f"Gazetteer not loaded, locations will not be geocoded: {e}")
+    return places
+
+@lru_cache(maxsize=4096)
+def _lookup(location: str):
+    places = _gazetteer()
+    
+    # Whole string, then each comma-separated part ('Farm A, Fouka'),
+    # then runs of up to three words, longest first
+    candidates = [location] + location.split(',')
+    for part in candidates:
+        key = _normalize(part)
+        if key in places:
+            return places[key]
+    
+    words = _normalize(location).split()
+    for size in range(min(3, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            key = ' '.join(words[start:start + size])
+            if key in places:
+                return places[key]
+    
+    return None
+
+def resolve_location(location: str):
+    """Coordinates (latitude, longitude) of a free-text location, or None if no place is recognised"""
+    if not location or not location.strip():
+        return None
+    return _lookup(location.strip().lower())
+
+def resolve_coordinates(location, latitude=None, longitude=None):
+    """
+    Coordinates for a new product: explicit latitude/longitude when both are
+    given, otherwise the gazetteer match for its location (or None).
+    Raises ValueError for out-of-range or non-numeric explicit coordinates.
+    """
+    if latitude not in (None, '') and longitude not in (None, ''):
+        return parse_point(latitude, longitude)
+    return resolve_location(location)
+
+def parse_point(latitude, longitude) -> tuple:
+    """Validate a (latitude, longitude) pair. Raises ValueError"""
+    lat = float(latitude)
+    lon = float(longitude)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Coordinates out of range")
+    return lat, lon
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    """Great-circle distance in kilometres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def bounding_box(lat, lon, radius_km) -> tuple:
+    """
+    (min_lat, max_lat, min_lon, max_lon) enclosing the circle. Longitude widens
+    with latitude; near the poles the box spans all longitudes. Boxes are not
+    wrapped across the antimeridian.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    delta_lon = 180.0 if cos_lat < 1e-6 else min(180.0, delta_lat / cos_lat)
+    
+    return (max(-90.0, lat - delta_lat), min(90.0, lat + delta_lat),
+            max(-180.0, lon - delta_lon), min(180.0, lon + delta_lon))
+
+def nearby(query, lat, lon, radius_km, limit) -> list:
+    """
+    Narrow a Product query to the `limit` rows nearest (lat, lon) within
+    `radius_km`. The bounding box is answered by the R*Tree (or the columns),
+    candidates are ordered in SQL by a flat-earth approximation, and the
+    survivors get an exact haversine distance.
+    Returns [(row, distance_km)] nearest first.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    
+    if rtree_enabled:
+        in_box = select(_geo.c.id).where(
+            _geo.c.max_lat >= min_lat, _geo.c.min_lat <= max_lat,
+            _geo.c.max_lon >= min_lon, _geo.c.min_lon <= max_lon
+        )
+        query = query.filter(Product.id.in_(in_box))
+    else:
+        query = query.filter(
+            Product.latitude.between(min_lat, max_lat),
+            Product.longitude.between(min_lon, max_lon)
+        )
+    
+    # Squared equirectangular distance (in degrees) ranks like the real one at these scales
+    lon_scale = math.cos(math.radians(lat))
+    d_lat = Product.latitude - lat
+    d_lon = (Product.longitude - lon) * lon_scale
+    rows = query.order_by(d_lat * d_lat + d_lon * d_lon).limit(limit).all()
+    
+    results = []
+    for row in rows:
+        distance = haversine_km(lat, lon, row.latitude, row.longitude)
+        if distance <= radius_km:
+            results.append((row, distance))
+    results.sort(key=lambda item: item[1])
+    return results
@@ -0,0 +1,157 @@
+"""Idempotency-Key support for POST endpoints: retries replay the original response"""
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+from flask import current_app, jsonify, make_response, request, session
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey
+from config import Config
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+
+def _fingerprint() -> str:
+    digest = hashlib.sha256()
+    for part in (request.method.encode(), request.path.encode(), request.get_data()):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _replay(row):
+    response = current_app.response_class(row.response_body, status=row.response_status, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _claim(user_id, key, fingerprint):
+    """
+    Insert an in-progress row for the key. Returns None if this request now owns
+    the key, otherwise the existing row (committed by an earlier request).
+    """
+    now = datetime.utcnow()
+    table = IdempotencyKey.__table__
+    
+    # Expired keys are dropped as new ones are claimed (range delete on the expires_at index)
+    db.session.execute(delete(table).where(table.c.expires_at < now))
+    db.session.add(IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        fingerprint=fingerprint,
+        status='in_progress',
+        locked_at=now,
+        created_at=now,
+        expires_at=now + Config.IDEMPOTENCY_KEY_TTL
+    ))
+    try:
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+    
+    return _load(user_id, key)
+
+def _load(user_id, key):
+    # End any open read transaction first so each poll sees the latest committed row
+    db.session.rollback()
+    table = IdempotencyKey.__table__
+    return db.session.execute(
+        select(table).where(table.c.user_id == user_id, table.c.key == key)
+    ).first()
+
+def _take_over(row) -> bool:
+    """Take over an in-progress key older than IDEMPOTENCY_LOCK_TIMEOUT (e.g. its worker died)"""
+    table = IdempotencyKey.__table__
+    result = db.session.execute(
+        update(table)
+        .where(table.c.id == row.id, table.c.status == 'in_progress', table.c.locked_at == row.locked_at)
+        .values(locked_at=datetime.utcnow())
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def _finish(user_id, key, response):
+    table = IdempotencyKey.__table__
+    db.session.rollback()
+    if response.status_code >= 500:
+        # Server errors aren't final: release the key so the client's retry runs again
+        db.session.execute(delete(table).where(table.c.user_id == user_id, table.c.key == key))
+    else:
+        db.session.execute(
+            update(table)
+            .where(table.c.user_id == user_id, table.c.key == key)
+            .values(status='completed', response_status=response.status_code,
+                    response_body=response.get_data(as_text=True))
+        )
+    db.session.commit()
+
+def idempotent(f):
+    """
+    Honour an `Idempotency-Key` header, scoped to the logged-in user:
+    the first request with a key runs and its response is stored for
+    IDEMPOTENCY_KEY_TTL; later requests with the same key and body get that
+    response replayed, a different body gets 422, and a duplicate arriving
+    while the first is still running waits for it instead of running twice.
+    Requests without the header (or without a session) run normally.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        user_id = session.get('user_id') if session.get('logged_in') else None
+        if not key or not user_id:
+            return f(*args, **kwargs)
+        
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({
+                "error": "Invalid idempotency key",
+                "message": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"
+            }), 400
+        
+        fingerprint = _fingerprint()
+        deadline = time.monotonic() + Config.IDEMPOTENCY_WAIT_SECONDS
+        
+        while True:
+            row = _claim(user_id, key, fingerprint)
+            if row is None:
+                break
+            
+            if row.fingerprint != fingerprint:
+                return jsonify({
+                    "error": "Idempotency key reused",
+                    "message": f"This {HEADER} was already used for a different request"
+                }), 422
+            
+            if row.status == 'completed':
+                return _replay(row)
+            
+            if datetime.utcnow() - row.locked_at > Config.IDEMPOTENCY_LOCK_TIMEOUT and _take_over(row):
+                break
+            
+            # Another request with this key is in flight: wait for its outcome
+            while row is not None and row.status == 'in_progress' and time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                row = _load(user_id, key)
+            
+            if row is not None and row.status == 'completed':
+                return _replay(row)
+            
+            if row is not None and time.monotonic() >= deadline:
+                response = jsonify({
+                    "error": "Request in progress",
+                    "message": f"A request with this {HEADER} is still being processed"
+                })
+                response.headers['Retry-After'] = '1'
+                return response, 409
+            # The first attempt failed with a server error and released the key: try to claim it again
+        
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            _finish(user_id, key, make_response('', 500))
+            raise
+        
+        _finish(user_id, key, response)
+        return response
+    
+    return decorated_function
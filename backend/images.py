@@ -0,0 +1,60 @@
+"""Resized photo variants (thumb / card / full) generated on a background worker pool"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow not installed: photos are served as uploaded
+    Image = None
+
+_executor = ThreadPoolExecutor(max_workers=Config.PHOTO_VARIANT_WORKERS, thread_name_prefix='photo-variants')
+
+def variant_filename(filename: str, size: str) -> str:
+    """Name of a photo's variant file, e.g. 'abc.jpg' -> 'abc.card.jpg'"""
+    stem = filename.rsplit('.', 1)[0]
+    return f"{stem}.{size}.jpg"
+
+def schedule_variants(filename: str):
+    """Queue variant generation for an uploaded photo; returns immediately"""
+    if Image is None:
+        return None
+    return _executor.submit(generate_variants, filename)
+
+def generate_variants(filename: str) -> list:
+    """
+    Write every configured variant of a photo in UPLOAD_FOLDER as a recompressed JPEG
+    no larger than its bounding box. Returns the variant filenames written.
+    """
+    source_path = os.path.join(Config.UPLOAD_FOLDER, filename)
+    written = []
+    
+    try:
+        source_bytes = os.path.getsize(source_path)
+        with Image.open(source_path) as source:
+            # Honour camera rotation, then drop alpha/palette so it can be saved as JPEG
+            image = ImageOps.exif_transpose(source).convert('RGB')
+        source_dimensions = image.size
+        
+        # Largest first, so each smaller variant is resampled from fewer pixels
+        for size, max_dimension in sorted(Config.PHOTO_VARIANTS.items(), key=lambda item: -item[1]):
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            
+            name = variant_filename(filename, size)
+            path = os.path.join(Config.UPLOAD_FOLDER, name)
+            # Write under a temporary name so a half-written variant is never served
+            temp_path = f"{path}.tmp"
+            image.save(temp_path, 'JPEG', quality=Config.PHOTO_VARIANT_QUALITY, optimize=True, progressive=True)
+            
+            # A photo already within this size that doesn't shrink on re-encoding is
+            # better served as the original (the route falls back to it)
+            if image.size == source_dimensions and os.path.getsize(temp_path) >= source_bytes:
+                os.remove(temp_path)
+                continue
+            
+            os.replace(temp_path, path)
+            written.append(name)
+    except Exception as e:
+        print(f"Failed to generate photo variants for {filename}: {e}")
+    
+    return written
@@ -0,0 +1,176 @@
+"""In-memory "top farmers" leaderboard ranked by a confidence-adjusted rating score"""
+import bisect
+import math
+import threading
+from models import db, User, Product, FarmerRatingStats
+
+# 95% confidence for the Wilson interval
+WILSON_Z = 1.96
+
+def wilson_lower_bound(rating_sum: int, rating_count: int, z: float = WILSON_Z) -> float:
+    """
+    Lower bound of the Wilson score interval for a farmer's ratings, with the
+    1-5 star average mapped onto [0, 1]. A farmer with a single 5-star vote
+    scores well below one with hundreds of 4.8s.
+    """
+    if not rating_count:
+        return 0.0
+    
+    n = rating_count
+    p = (rating_sum - n) / (4 * n)
+    denominator = 1 + z * z / n
+    centre = p + z * z / (2 * n)
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return (centre - margin) / denominator
+
+class Leaderboard:
+    """
+    Farmers kept pre-sorted by score, overall and per product category and
+    location (a farmer belongs to every category/location they list products in).
+    Lists hold (-score, -rating_count, farmer_id) so the best farmer is first and
+    a top-N read is a slice; a rating or new product only re-positions one farmer.
+    """
+    
+    def __init__(self):
+        self._farmers = {}  # farmer_id -> {'username', 'key', 'average', 'count', 'facets'}
+        self._ranking = []
+        self._facets = {}  # ('category' | 'location', value) -> sorted list like _ranking
+        self._lock = threading.Lock()
+    
+    def build(self):
+        """(Re)build from the database: one query over the rating stats, one over product facets"""
+        rows = db.session.query(User.id, User.username, FarmerRatingStats) \
+            .join(FarmerRatingStats, FarmerRatingStats.farmer_id == User.id) \
+            .filter(User.user_type == 'farmer', FarmerRatingStats.rating_count > 0)
+        
+        facet_rows = db.session.query(Product.farmer_id, Product.category, Product.location).distinct()
+        facets_by_farmer = {}
+        for farmer_id, category, location in facet_rows:
+            facets_by_farmer.setdefault(farmer_id, set()).update(self._facets_of(category, location))
+        
+        farmers = {}
+        ranking = []
+        facets = {}
+        for farmer_id, username, stats in rows:
+            entry = self._entry(username, stats, facets_by_farmer.get(farmer_id, set()))
+            farmers[farmer_id] = entry
+            ranking.append(entry['key'] + (farmer_id,))
+            for facet in entry['facets']:
+                facets.setdefault(facet, []).append(entry['key'] + (farmer_id,))
+        
+        ranking.sort()
+        for members in facets.values():
+            members.sort()
+        
+        with self._lock:
+            self._farmers = farmers
+            self._ranking = ranking
+            self._facets = facets
+    
+    def refresh_farmer(self, farmer_id: int):
+        """Re-rank one farmer from their current rating stats (call after a rating write commits)"""
+        row = db.session.query(User.username, FarmerRatingStats) \
+            .join(FarmerRatingStats, FarmerRatingStats.farmer_id == User.id) \
+            .filter(User.id == farmer_id, User.user_type == 'farmer') \
+            .first()
+        
+        with self._lock:
+            previous = self._farmers.get(farmer_id)
+        
+        if previous:
+            facets = previous['facets']
+        else:
+            # Newly ranked farmer: look up where they sell
+            facets = set()
+            for category, location in db.session.query(Product.category, Product.location) \
+                    .filter(Product.farmer_id == farmer_id).distinct():
+                facets.update(self._facets_of(category, location))
+        
+        with self._lock:
+            previous = self._farmers.pop(farmer_id, None)
+            if previous:
+                self._remove(farmer_id, previous)
+            
+            if row and row[1].rating_count:
+                entry = self._entry(row[0], row[1], facets)
+                self._farmers[farmer_id] = entry
+                self._insert(farmer_id, entry)
+    
+    def add_product(self, product):
+        """Place a product's farmer in the product's category and location lists"""
+        with self._lock:
+            entry = self._farmers.get(product.farmer_id)
+            if not entry:
+                return
+            
+            item = entry['key'] + (product.farmer_id,)
+            for facet in self._facets_of(product.category, product.location):
+                if facet not in entry['facets']:
+                    entry['facets'].add(facet)
+                    bisect.insort(self._facets.setdefault(facet, []), item)
+    
+    def top(self, limit: int, category: str = None, location: str = None) -> list:
+        """The `limit` best farmers, optionally only those listing in a category and/or location"""
+        with self._lock:
+            if category:
+                members = self._facets.get(('category', category), [])
+                required = ('location', location) if location else None
+            elif location:
+                members = self._facets.get(('location', location), [])
+                required = None
+            else:
+                members = self._ranking
+                required = None
+            
+            results = []
+            for _, _, farmer_id in members:
+                entry = self._farmers[farmer_id]
+                if required and required not in entry['facets']:
+                    continue
+                results.append({
+                    'rank': len(results) + 1,
+                    'farmer_id': farmer_id,
+                    'farmer_username': entry['username'],
+                    'average_rating': entry['average'],
+                    'total_ratings': entry['count'],
+                    'score': round(-entry['key'][0], 4)
+                })
+                if len(results) >= limit:
+                    break
+            return results
+    
+    @staticmethod
+    def _facets_of(category, location):
+        facets = set()
+        if category:
+            facets.add(('category', category))
+        if location:
+            facets.add(('location', location))
+        return facets
+    
+    @staticmethod
+    def _entry(username, stats, facets):
+        score = wilson_lower_bound(stats.rating_sum, stats.rating_count)
+        return {
+            'username': username,
+            'key': (-score, -stats.rating_count),
+            'average': stats.average(),
+            'count': stats.rating_count,
+            'facets': set(facets)
+        }
+    
+    def _insert(self, farmer_id, entry):
+        item = entry['key'] + (farmer_id,)
+        bisect.insort(self._ranking, item)
+        for facet in entry['facets']:
+            bisect.insort(self._facets.setdefault(facet, []), item)
+    
+    def _remove(self, farmer_id, entry):
+        item = entry['key'] + (farmer_id,)
+        for members in [self._ranking] + [self._facets[facet] for facet in entry['facets']]:
+            i = bisect.bisect_left(members, item)
+            if i < len(members) and members[i] == item:
+                del members[i]
+
+# Farmer ranking served by /api/farmers/leaderboard
+leaderboard = Leaderboard()
@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from storage import is_object_key
+import os
 
 db = SQLAlchemy()
 
@@ -15,6 +17,9 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     
+    # Farmers' rating aggregates (None until the first rating)
+    rating_stats = db.relationship('FarmerRatingStats', uselist=False)
+    
     def set_password(self, password):
         """Hash and set the password"""
         self.password_hash = generate_password_hash(password)
@@ -24,23 +29,18 @@ class User(db.Model):
         return check_password_hash(self.password_hash, password)
     
     def get_average_rating(self):
-        """Calculate average rating for farmers"""
+        """Average rating for farmers, read from the maintained rating stats"""
         if self.user_type != 'farmer':
             return None
         
-        from sqlalchemy import func
-        result = db.session.query(func.avg(FarmerRating.rating)).filter(
-            FarmerRating.farmer_id == self.id
-        ).scalar()
-        
-        return round(float(result), 2) if result else None
+        return self.rating_stats.average() if self.rating_stats else None
     
     def get_rating_count(self):
         """Get total number of ratings for farmers"""
         if self.user_type != 'farmer':
             return 0
         
-        return FarmerRating.query.filter_by(farmer_id=self.id).count()
+        return self.rating_stats.rating_count if self.rating_stats else 0
     
     def to_dict(self):
         """Convert user object to dictionary"""
@@ -75,12 +75,33 @@ class Product(db.Model):
     category = db.Column(db.String(100), nullable=True)
     photo_filename = db.Column(db.String(255), nullable=True)
     location = db.Column(db.String(200), nullable=True)
+    latitude = db.Column(db.Float, nullable=True)  # Resolved from location when the product is created
+    longitude = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_available = db.Column(db.Boolean, default=True)
     
     # Relationship
     farmer = db.relationship('User', backref='products')
     
+    # Catalogue indexes: keyset pagination (newest available first), optionally
+    # narrowed by one of the filter columns, plus price range filtering
+    __table_args__ = (
+        db.Index('ix_products_available_created', 'is_available', 'created_at', 'id'),
+        db.Index('ix_products_available_category', 'is_available', 'category', 'created_at', 'id'),
+        db.Index('ix_products_available_location', 'is_available', 'location', 'created_at', 'id'),
+        db.Index('ix_products_available_unit', 'is_available', 'unit', 'created_at', 'id'),
+        db.Index('ix_products_available_price', 'is_available', 'price'),
+    )
+    
+    def photo_url(self):
+        """Public photo URL: content-addressed (immutable) for stored objects, by product id for legacy uploads"""
+        if not self.photo_filename:
+            return None
+        if is_object_key(self.photo_filename):
+            return f'/api/products/photos/{os.path.basename(self.photo_filename)}'
+        return f'/api/products/{self.id}/photo'
+    
     def to_dict(self):
         """Convert product object to dictionary"""
         return {
@@ -93,9 +114,12 @@ class Product(db.Model):
             'quantity': self.quantity,
             'unit': self.unit,
             'category': self.category,
-            'photo_url': f'/api/products/{self.id}/photo' if self.photo_filename else None,
+            'photo_url': self.photo_url(),
             'location': self.location,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_available': self.is_available
         }
     
@@ -167,7 +191,11 @@ class FarmerRating(db.Model):
     user = db.relationship('User', foreign_keys=[user_id], backref='ratings_given')
     
     # Unique constraint: one user can only rate a farmer once
-    __table_args__ = (db.UniqueConstraint('farmer_id', 'user_id', name='unique_farmer_user_rating'),)
+    # Index: a farmer's ratings newest first (keyset pagination)
+    __table_args__ = (
+        db.UniqueConstraint('farmer_id', 'user_id', name='unique_farmer_user_rating'),
+        db.Index('ix_farmer_ratings_farmer_created', 'farmer_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         """Convert rating object to dictionary"""
@@ -187,6 +215,32 @@ class FarmerRating(db.Model):
         return f'<FarmerRating {self.rating} stars by User {self.user_id} for Farmer {self.farmer_id}>'
 
 
+class FarmerRatingStats(db.Model):
+    __tablename__ = 'farmer_rating_stats'
+    
+    # Running aggregates of farmer_ratings, updated in the same transaction as every rating write
+    farmer_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def average(self):
+        """Average rating rounded to 2 places, or None without ratings"""
+        return round(self.rating_sum / self.rating_count, 2) if self.rating_count else None
+    
+    def distribution(self):
+        """Number of ratings per star value, {1: n, ..., 5: n}"""
+        return {i: getattr(self, f'stars_{i}') for i in range(1, 6)}
+    
+    def __repr__(self):
+        return f'<FarmerRatingStats Farmer {self.farmer_id}: {self.rating_count} ratings>'
+
+
 class Package(db.Model):
     __tablename__ = 'packages'
     
@@ -196,11 +250,19 @@ class Package(db.Model):
     recipient_address = db.Column(db.String(255), nullable=False)
     status = db.Column(db.String(20), default='pending')  # 'pending', 'picked_up', 'in_transit', 'delivered', 'failed'
     tracking_number = db.Column(db.String(50), unique=True, nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True)  # Set for packages created by dispatch
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationship
+    # Indexes: at most one package per order; a transporter's open workload
+    __table_args__ = (
+        db.Index('ux_packages_order', 'order_id', unique=True),
+        db.Index('ix_packages_transporter_status', 'transporter_id', 'status'),
+    )
+    
+    # Relationships
     transporter = db.relationship('User', backref='packages')
+    order = db.relationship('Order', backref=db.backref('package', uselist=False))
     
     def to_dict(self):
         """Convert package object to dictionary"""
@@ -212,6 +274,7 @@ class Package(db.Model):
             'recipient_address': self.recipient_address,
             'status': self.status,
             'tracking_number': self.tracking_number,
+            'order_id': self.order_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -229,6 +292,11 @@ class Order(db.Model):
     status = db.Column(db.String(20), default='pending')  # 'pending', 'completed', 'cancelled'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Index: a buyer's order history newest first (keyset pagination)
+    __table_args__ = (
+        db.Index('ix_orders_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
     # Relationships
     user = db.relationship('User', backref='orders')
     items = db.relationship('OrderItem', backref='order', cascade='all, delete-orphan')
@@ -253,6 +321,11 @@ class OrderItem(db.Model):
     quantity = db.Column(db.Float, nullable=False)
     price = db.Column(db.Float, nullable=False)  # Price at time of purchase
     
+    # Index: an order's lines (SQLite doesn't index foreign keys on its own)
+    __table_args__ = (
+        db.Index('ix_order_items_order', 'order_id'),
+    )
+    
     # Relationship
     product = db.relationship('Product')
     
@@ -266,3 +339,155 @@ class OrderItem(db.Model):
             'subtotal': self.price * self.quantity
         }
 
+
+class SalesDaily(db.Model):
+    __tablename__ = 'sales_daily'
+    
+    # Daily sales rollup per farmer and product, updated in the same transaction as every order.
+    # The primary key leads with (farmer_id, day), so a farmer's date range is one index range scan.
+    farmer_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # UTC day of the order
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    units = db.Column(db.Float, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SalesDaily Farmer {self.farmer_id} Product {self.product_id} {self.day}: {self.units}>'
+
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_events'
+    
+    # Side effects to run after a write, recorded in the same transaction (see outbox.py)
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'processing', 'done', 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not retried before this
+    locked_at = db.Column(db.DateTime, nullable=True)  # When a worker claimed it
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    
+    # Index: workers claim due events oldest first; purging and reclaiming scan by status too
+    __table_args__ = (
+        db.Index('ix_outbox_events_status_available', 'status', 'available_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.event_type} - {self.status}>'
+
+
+class CollectionVersion(db.Model):
+    __tablename__ = 'collection_versions'
+    
+    # One row per cached collection ('products', 'ratings'); bumped on every write to it
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CollectionVersion {self.name} v{self.version}>'
+
+
+class Upload(db.Model):
+    __tablename__ = 'uploads'
+    
+    id = db.Column(db.String(32), primary_key=True)  # Random hex token, also the resume handle
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # None for farmer applicants
+    purpose = db.Column(db.String(20), nullable=False)  # 'photo', 'certification'
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.Integer, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='pending')  # 'pending', 'completed', 'attached'
+    storage_key = db.Column(db.String(255), nullable=True)  # Content-addressed key once completed
+    client_ip = db.Column(db.String(45), nullable=True)  # Caps unfinished anonymous uploads per client
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)  # While pending; pushed back by every part
+    
+    # Index: the sweeper's range scan over lapsed pending uploads
+    __table_args__ = (
+        db.Index('ix_uploads_status_expires', 'status', 'expires_at'),
+    )
+    
+    @property
+    def part_count(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    def part_size(self, part_number):
+        """Expected byte length of a part (the last one may be short)"""
+        if part_number < self.part_count - 1:
+            return self.chunk_size
+        return self.total_size - self.chunk_size * (self.part_count - 1)
+    
+    def to_dict(self, received_parts=None):
+        """Convert upload object to dictionary"""
+        return {
+            'id': self.id,
+            'purpose': self.purpose,
+            'filename': self.filename,
+            'total_size': self.total_size,
+            'chunk_size': self.chunk_size,
+            'part_count': self.part_count,
+            'received_parts': received_parts if received_parts is not None else [],
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+    
+    def __repr__(self):
+        return f'<Upload {self.id} - {self.status}>'
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    
+    # One row per (user, Idempotency-Key header): the request it was first used with and its response
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status = db.Column(db.String(20), nullable=False, default='in_progress')  # 'in_progress', 'completed'
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    locked_at = db.Column(db.DateTime, default=datetime.utcnow)  # When the current attempt started
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='unique_user_idempotency_key'),
+        db.Index('ix_idempotency_keys_expires', 'expires_at'),
+    )
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} - {self.status}>'
+
+
+class Reservation(db.Model):
+    __tablename__ = 'reservations'
+    
+    # A time-limited hold on stock for a buyer's cart; expired rows no longer count and are swept in bulk
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    # Relationship
+    product = db.relationship('Product')
+    
+    # Index: active holds per product (available-to-sell); expiry alone for the sweeper
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='unique_user_product_reservation'),
+        db.Index('ix_reservations_product_expires', 'product_id', 'expires_at'),
+        db.Index('ix_reservations_expires', 'expires_at'),
+    )
+    
+    def __repr__(self):
+        return f'<Reservation {self.quantity} of Product {self.product_id} for User {self.user_id}>'
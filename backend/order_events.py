@@ -0,0 +1,38 @@
+"""Outbox handlers for order events"""
+from models import db, User, Product, OrderItem
+from outbox import handler
+from dispatch import dispatch_orders
+
+@handler('order.created')
+def notify_farmers(events):
+    """
+    Tell each farmer about new orders for their products. The lines of every
+    order in the batch are loaded in one query and grouped per farmer, so a
+    farmer gets one notification per batch. Notifications are logged for now.
+    """
+    order_ids = [event['payload']['order_id'] for event in events]
+    rows = db.session.query(
+        Product.farmer_id, User.username, OrderItem.order_id, Product.name, OrderItem.quantity, Product.unit
+    ).join(Product, Product.id == OrderItem.product_id) \
+        .join(User, User.id == Product.farmer_id) \
+        .filter(OrderItem.order_id.in_(order_ids)) \
+        .order_by(Product.farmer_id, OrderItem.order_id)
+    
+    notifications = {}
+    for farmer_id, username, order_id, name, quantity, unit in rows:
+        notification = notifications.setdefault(farmer_id, {'username': username, 'orders': set(), 'lines': []})
+        notification['orders'].add(order_id)
+        notification['lines'].append(f"{quantity:g} {unit or ''} {name}".replace('  ', ' '))
+    
+    for farmer_id, notification in notifications.items():
+        orders = ', '.join(f"#{order_id}" for order_id in sorted(notification['orders']))
+        print(f"📬 Notify farmer {notification['username']} ({farmer_id}): new order(s) {orders} - "
+              f"{'; '.join(notification['lines'])}")
+
+@handler('order.completed')
+def dispatch_completed_orders(events):
+    """Create and assign packages for newly completed orders (orders that already have one are skipped)"""
+    order_ids = [event['payload']['order_id'] for event in events]
+    packages = dispatch_orders(order_ids, limit=len(order_ids))
+    for package in packages:
+        print(f"🚚 Dispatched order #{package.order_id} as {package.tracking_number} to transporter {package.transporter_id}")
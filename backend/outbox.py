@@ -0,0 +1,167 @@
+"""
+Transactional outbox: side effects are recorded as events in the same
+transaction as the write that causes them, then run by background workers
+in batches, with retries and at-least-once delivery (handlers must tolerate
+seeing an event twice).
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, or_, select, update
+from models import db, OutboxEvent
+from config import Config
+
+# event_type -> function taking a list of {'id', 'payload', 'attempts'} dicts
+_handlers = {}
+_wakeup = threading.Event()
+
+def handler(event_type: str):
+    """
+    Register the batch handler for an event type. It is called with every
+    claimed event of that type at once and should raise if the batch failed
+    (the whole batch is then retried).
+    """
+    def decorator(f):
+        _handlers[event_type] = f
+        return f
+    return decorator
+
+def emit(event_type: str, payload: dict):
+    """Record an event in the caller's transaction; it is only processed if that transaction commits"""
+    db.session.add(OutboxEvent(event_type=event_type, payload=json.dumps(payload)))
+
+def notify():
+    """Wake this process's idle workers (call after committing events)"""
+    _wakeup.set()
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff after the given number of failed attempts"""
+    seconds = Config.OUTBOX_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1)
+    return timedelta(seconds=min(seconds, Config.OUTBOX_RETRY_MAX_SECONDS))
+
+def claim_batch(limit: int = None):
+    """
+    Claim up to `limit` due events, oldest first, with one UPDATE ... RETURNING:
+    pending events whose retry time has come, plus events claimed by a worker
+    that didn't finish within OUTBOX_LOCK_TIMEOUT. Concurrent workers never
+    claim the same event. Returns (claimed_at, events).
+    An idle poll is a single read: the write lock is only taken when something is due.
+    """
+    now = datetime.utcnow()
+    table = OutboxEvent.__table__
+    
+    is_due = or_(
+        and_(table.c.status == 'pending', table.c.available_at <= now),
+        and_(table.c.status == 'processing', table.c.locked_at < now - Config.OUTBOX_LOCK_TIMEOUT)
+    )
+    if db.session.execute(select(table.c.id).where(is_due).limit(1)).first() is None:
+        db.session.rollback()
+        return now, []
+    
+    due = select(table.c.id).where(is_due).order_by(table.c.id).limit(limit or Config.OUTBOX_BATCH_SIZE)
+    
+    rows = db.session.execute(
+        update(table)
+        .where(table.c.id.in_(due.scalar_subquery()))
+        .values(status='processing', locked_at=now, attempts=table.c.attempts + 1)
+        .returning(table.c.id, table.c.event_type, table.c.payload, table.c.attempts)
+    ).all()
+    db.session.commit()
+    
+    return now, sorted(rows, key=lambda row: row.id)
+
+def _finish(ids, claimed_at, values):
+    # Only rows still held under this claim: a reclaimed event belongs to its new worker
+    table = OutboxEvent.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id.in_(ids), table.c.status == 'processing', table.c.locked_at == claimed_at)
+        .values(**values)
+    )
+
+def process_batch(limit: int = None) -> int:
+    """Claim one batch and run it through the handlers. Returns the number of events claimed"""
+    claimed_at, rows = claim_batch(limit)
+    if not rows:
+        return 0
+    
+    by_type = {}
+    for row in rows:
+        by_type.setdefault(row.event_type, []).append(row)
+    
+    for event_type, events in by_type.items():
+        ids = [event.id for event in events]
+        try:
+            handle = _handlers.get(event_type)
+            if handle is None:
+                raise LookupError(f"No outbox handler for '{event_type}'")
+            handle([
+                {'id': event.id, 'payload': json.loads(event.payload), 'attempts': event.attempts}
+                for event in events
+            ])
+            db.session.commit()
+            _finish(ids, claimed_at, {'status': 'done', 'processed_at': datetime.utcnow(), 'last_error': None})
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Outbox: {event_type} batch of {len(events)} failed: {e}")
+            now = datetime.utcnow()
+            for event in events:
+                if event.attempts >= Config.OUTBOX_MAX_ATTEMPTS:
+                    values = {'status': 'failed', 'last_error': str(e)}
+                else:
+                    values = {'status': 'pending', 'available_at': now + retry_delay(event.attempts),
+                              'last_error': str(e)}
+                _finish([event.id], claimed_at, values)
+            db.session.commit()
+    
+    return len(rows)
+
+def purge_processed() -> int:
+    """Delete processed events older than OUTBOX_RETENTION"""
+    table = OutboxEvent.__table__
+    result = db.session.execute(
+        delete(table).where(
+            table.c.status == 'done',
+            table.c.processed_at < datetime.utcnow() - Config.OUTBOX_RETENTION
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+def run_worker(app, stop: threading.Event = None):
+    """
+    Drain the outbox until `stop` is set: batches back to back while there is
+    work, otherwise wait OUTBOX_POLL_INTERVAL (or until notify()).
+    Processed events are purged about once an hour.
+    """
+    stop = stop or threading.Event()
+    next_purge = 0
+    
+    while not stop.is_set():
+        claimed = 0
+        try:
+            with app.app_context():
+                claimed = process_batch()
+                if time.monotonic() >= next_purge:
+                    purged = purge_processed()
+                    if purged:
+                        print(f"Outbox: purged {purged} processed event(s)")
+                    next_purge = time.monotonic() + 3600
+        except Exception as e:
+            print(f"Outbox worker error: {e}")
+        
+        if not claimed:
+            _wakeup.wait(Config.OUTBOX_POLL_INTERVAL)
+            _wakeup.clear()
+
+def start_workers(app, count: int = None):
+    """Start `count` daemon worker threads (OUTBOX_WORKERS by default)"""
+    count = Config.OUTBOX_WORKERS if count is None else count
+    threads = []
+    for i in range(count):
+        thread = threading.Thread(target=run_worker, args=(app,), name=f'outbox-worker-{i}', daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
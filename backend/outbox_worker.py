@@ -0,0 +1,69 @@
+"""
+Standalone outbox worker: runs the side effects recorded in outbox_events
+(farmer notifications, ...) outside the web process. Start the web app with
+OUTBOX_WORKERS=0 when using this, or run both; workers never claim the same event.
+
+Usage:
+    python outbox_worker.py
+    python outbox_worker.py --threads 4
+    python outbox_worker.py --once
+"""
+
+import sys
+import os
+import argparse
+import threading
+
+# Add the current directory to the path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from outbox import process_batch, run_worker
+
+def drain():
+    """Process batches until nothing is due"""
+    total = 0
+    with app.app_context():
+        while True:
+            claimed = process_batch()
+            if not claimed:
+                break
+            total += claimed
+    print(f"✅ Processed {total} outbox event(s)")
+
+def run(threads):
+    """Run `threads` workers until interrupted"""
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=run_worker, args=(app, stop), name=f'outbox-worker-{i}')
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    print(f"🚚 Outbox worker running with {threads} thread(s). Press Ctrl+C to stop.")
+    
+    try:
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=1)
+    except KeyboardInterrupt:
+        print("Stopping...")
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Process outbox events')
+    parser.add_argument('--threads', type=int, default=2, help='Worker threads (default: 2)')
+    parser.add_argument('--once', action='store_true', help='Drain due events and exit')
+    
+    args = parser.parse_args()
+    
+    try:
+        if args.once:
+            drain()
+        else:
+            run(max(1, args.threads))
+    except Exception as e:
+        print(f"❌ Outbox worker error: {e}")
+        sys.exit(1)
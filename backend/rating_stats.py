@@ -0,0 +1,62 @@
+"""Incrementally maintained farmer rating aggregates (farmer_rating_stats)"""
+from datetime import datetime
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from models import db, FarmerRating, FarmerRatingStats
+
+STAR_COLUMNS = {i: f'stars_{i}' for i in range(1, 6)}
+
+def record_rating(farmer_id: int, new_rating: int, old_rating: int = None):
+    """
+    Apply one rating write to the farmer's stats: a new rating when `old_rating`
+    is None, otherwise a change from `old_rating` to `new_rating`.
+    Call it after the rating itself has been flushed and commit both together.
+    The counters are incremented in SQL; if the farmer has no stats row yet
+    (their first rating, or ratings written before the table existed), the row
+    is rebuilt from the flushed ratings instead, which already include this write.
+    """
+    if old_rating == new_rating:
+        return
+    
+    table = FarmerRatingStats.__table__
+    values = {
+        'rating_sum': table.c.rating_sum + (new_rating - (old_rating or 0)),
+        STAR_COLUMNS[new_rating]: table.c[STAR_COLUMNS[new_rating]] + 1,
+        'updated_at': datetime.utcnow()
+    }
+    if old_rating is None:
+        values['rating_count'] = table.c.rating_count + 1
+    else:
+        values[STAR_COLUMNS[old_rating]] = table.c[STAR_COLUMNS[old_rating]] - 1
+    
+    result = db.session.execute(update(table).where(table.c.farmer_id == farmer_id).values(values))
+    if result.rowcount == 0:
+        rebuild_rating_stats(farmer_id)
+
+def rebuild_rating_stats(farmer_id: int = None) -> int:
+    """
+    Recompute stats from farmer_ratings with one grouped INSERT ... SELECT,
+    for one farmer or (by default) all of them. Runs in the caller's
+    transaction; returns the number of farmers with ratings.
+    """
+    table = FarmerRatingStats.__table__
+    
+    source = select(
+        FarmerRating.farmer_id,
+        func.sum(FarmerRating.rating),
+        func.count(FarmerRating.id),
+        *[func.sum(case((FarmerRating.rating == i, 1), else_=0)) for i in STAR_COLUMNS],
+        func.max(func.coalesce(FarmerRating.updated_at, FarmerRating.created_at))
+    ).group_by(FarmerRating.farmer_id)
+    
+    clear = delete(table)
+    if farmer_id is not None:
+        source = source.where(FarmerRating.farmer_id == farmer_id)
+        clear = clear.where(table.c.farmer_id == farmer_id)
+    
+    db.session.execute(clear)
+    result = db.session.execute(insert(table).from_select(
+        ['farmer_id', 'rating_sum', 'rating_count', *STAR_COLUMNS.values(), 'updated_at'],
+        source
+    ))
+    return result.rowcount
@@ -0,0 +1,37 @@
+"""
+Script to rebuild the farmer_rating_stats aggregates from farmer_ratings.
+Run it if the stats ever drift (e.g. after editing ratings by hand).
+
+Usage:
+    python rebuild_rating_stats.py
+    python rebuild_rating_stats.py --farmer-id 2
+"""
+
+import sys
+import os
+import argparse
+
+# Add the current directory to the path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from rating_stats import rebuild_rating_stats
+
+def rebuild(farmer_id=None):
+    """Recount the rating aggregates of one farmer or all farmers"""
+    with app.app_context():
+        count = rebuild_rating_stats(farmer_id)
+        db.session.commit()
+        print(f"✅ Rebuilt rating stats for {count} farmer(s)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild farmer rating aggregates')
+    parser.add_argument('--farmer-id', type=int, help='Rebuild only this farmer (default: all farmers)')
+    
+    args = parser.parse_args()
+    
+    try:
+        rebuild(args.farmer_id)
+    except Exception as e:
+        print(f"❌ Error rebuilding rating stats: {e}")
+        sys.exit(1)
@@ -0,0 +1,38 @@
+"""
+Script to backfill the sales_daily rollup from orders and order_items.
+Run it once for orders placed before the rollup existed, or if it ever drifts
+(e.g. after editing orders by hand).
+
+Usage:
+    python rebuild_sales_daily.py
+    python rebuild_sales_daily.py --farmer-id 2
+"""
+
+import sys
+import os
+import argparse
+
+# Add the current directory to the path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from sales_rollup import rebuild_sales_daily
+
+def rebuild(farmer_id=None):
+    """Recompute the daily sales rollup of one farmer or all farmers"""
+    with app.app_context():
+        count = rebuild_sales_daily(farmer_id)
+        db.session.commit()
+        print(f"✅ Rebuilt {count} daily sales row(s)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill the daily sales rollup')
+    parser.add_argument('--farmer-id', type=int, help='Rebuild only this farmer (default: all farmers)')
+    
+    args = parser.parse_args()
+    
+    try:
+        rebuild(args.farmer_id)
+    except Exception as e:
+        print(f"❌ Error rebuilding sales rollup: {e}")
+        sys.exit(1)
@@ -0,0 +1,124 @@
+"""Cart reservations: time-limited stock holds and the background sweeper that expires them"""
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import and_, delete, func, literal, select, update
+from sqlalchemy.dialects.sqlite import insert
+from models import db, Product, Reservation
+from http_cache import bump_version
+from config import Config
+
+def held_quantity(product_id_column, now: datetime, exclude_user_id: int = None):
+    """
+    Correlated subquery: total quantity of active holds on a product, optionally
+    excluding one buyer's own holds. Served by the (product_id, expires_at) index.
+    """
+    conditions = [Reservation.product_id == product_id_column, Reservation.expires_at > now]
+    if exclude_user_id is not None:
+        conditions.append(Reservation.user_id != exclude_user_id)
+    return select(func.coalesce(func.sum(Reservation.quantity), 0)).where(*conditions).scalar_subquery()
+
+def available_quantities(product_ids, user_id: int = None) -> dict:
+    """
+    {product_id: quantity the buyer can still get} for the given products, in
+    one query: stock minus other buyers' active holds (everyone's for
+    anonymous viewers), never below 0 or above the stock itself.
+    """
+    now = datetime.utcnow()
+    rows = db.session.query(
+        Product.id, Product.quantity, held_quantity(Product.id, now, exclude_user_id=user_id)
+    ).filter(Product.id.in_(list(product_ids)))
+    return {product_id: min(quantity, max(0, quantity - held)) for product_id, quantity, held in rows}
+
+def available_quantity(product, user_id: int = None):
+    """Available-to-sell for one product as seen by `user_id` (see available_quantities)"""
+    return available_quantities([product.id], user_id).get(product.id, 0)
+
+def hold(user_id: int, product_id: int, quantity: float) -> bool:
+    """
+    Set the buyer's hold on a product to `quantity`, if stock minus everyone
+    else's active holds covers it. The check and the write are one
+    INSERT ... SELECT ... ON CONFLICT statement, so two buyers can't both take
+    the last units. Also extends the buyer's other holds (the cart is active).
+    Returns False (and changes nothing) when there isn't enough stock.
+    """
+    now = datetime.utcnow()
+    expires_at = now + Config.CART_HOLD_TTL
+    table = Reservation.__table__
+    
+    source = select(
+        literal(user_id), Product.id, literal(quantity), literal(now), literal(expires_at)
+    ).where(
+        Product.id == product_id,
+        Product.is_available == True,
+        Product.quantity - held_quantity(Product.id, now, exclude_user_id=user_id) >= quantity
+    )
+    stmt = insert(table).from_select(['user_id', 'product_id', 'quantity', 'created_at', 'expires_at'], source)
+    result = db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.product_id],
+        set_={'quantity': stmt.excluded.quantity, 'expires_at': stmt.excluded.expires_at}
+    ))
+    if result.rowcount == 0:
+        return False
+    
+    touch(user_id, now)
+    bump_version('reservations')
+    return True
+
+def touch(user_id: int, now: datetime = None):
+    """Push back the expiry of all of a buyer's active holds"""
+    now = now or datetime.utcnow()
+    db.session.execute(
+        update(Reservation)
+        .where(Reservation.user_id == user_id, Reservation.expires_at > now)
+        .values(expires_at=now + Config.CART_HOLD_TTL)
+        .execution_options(synchronize_session=False)
+    )
+
+def release(user_id: int, product_ids=None):
+    """Drop a buyer's holds on the given products (all of them by default)"""
+    conditions = [Reservation.user_id == user_id]
+    if product_ids is not None:
+        conditions.append(Reservation.product_id.in_(list(product_ids)))
+    result = db.session.execute(delete(Reservation).where(and_(*conditions)).execution_options(synchronize_session=False))
+    if result.rowcount:
+        bump_version('reservations')
+
+def sweep_expired() -> int:
+    """Delete every lapsed hold in one statement (range scan on the expires_at index)"""
+    result = db.session.execute(
+        delete(Reservation).where(Reservation.expires_at <= datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    # Lapsed holds already stopped counting; this lets cached catalogue responses catch up
+    if result.rowcount:
+        bump_version('reservations')
+    db.session.commit()
+    return result.rowcount
+
+def start_sweeper(app, interval: int = None, extra_sweeps=()):
+    """
+    Start a daemon thread that sweeps lapsed holds every `interval` seconds.
+    Lapsed holds already stop counting against stock the moment they expire;
+    the sweeper only keeps the table small. `extra_sweeps` are other
+    (description, function) cleanup jobs to run on the same schedule; each
+    function returns how many things it removed.
+    """
+    interval = interval or Config.RESERVATION_SWEEP_INTERVAL
+    sweeps = [('expired cart reservation(s)', sweep_expired), *extra_sweeps]
+    
+    def run():
+        while True:
+            time.sleep(interval)
+            for description, sweep in sweeps:
+                try:
+                    with app.app_context():
+                        swept = sweep()
+                    if swept:
+                        print(f"Swept {swept} {description}")
+                except Exception as e:
+                    print(f"Sweep of {description} failed: {e}")
+    
+    thread = threading.Thread(target=run, name='reservation-sweeper', daemon=True)
+    thread.start()
+    return thread
@@ -2,7 +2,10 @@
 from flask import Blueprint, jsonify, request, session
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from auth import user_type_required
-from models import db, User, FarmerApplication
+from models import db, User, FarmerApplication, Order
+from outbox import emit, notify
+from dispatch import dispatch_orders
+from http_cache import bump_version
 from config import Config
 from datetime import datetime
 
@@ -108,6 +111,7 @@ def approve_farmer_application(application_id):
         new_user.password_hash = application.password_hash
         
         db.session.add(new_user)
+        bump_version('users')
         
         # Update application status
         application.status = "approved"
@@ -262,6 +266,72 @@ def get_user_stats():
             "message": str(e)
         }), 500
 
+@admin_bp.route("/orders/<int:order_id>/complete", methods=["POST"])
+@jwt_required()
+@user_type_required('admin')
+def complete_order(order_id):
+    """Mark an order completed; the outbox workers then create and assign its package"""
+    try:
+        order = Order.query.get(order_id)
+        if not order:
+            return jsonify({
+                "error": "Order not found"
+            }), 404
+        
+        if order.status == 'cancelled':
+            return jsonify({
+                "error": "Invalid status",
+                "message": "A cancelled order cannot be completed"
+            }), 400
+        
+        if order.status != 'completed':
+            order.status = 'completed'
+            emit('order.completed', {'order_id': order.id})
+            db.session.commit()
+            notify()
+        
+        return jsonify({
+            "success": True,
+            "message": "Order marked as completed",
+            "order": order.to_dict()
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to complete order",
+            "message": str(e)
+        }), 500
+
+@admin_bp.route("/dispatch", methods=["POST"])
+@jwt_required()
+@user_type_required('admin')
+def dispatch_packages():
+    """Create and assign packages for completed orders that don't have one yet"""
+    try:
+        packages = dispatch_orders()
+        db.session.commit()
+        
+        return jsonify({
+            "success": True,
+            "count": len(packages),
+            "packages": [package.to_dict() for package in packages]
+        }), 200
+    
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "No transporters",
+            "message": str(e)
+        }), 409
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to dispatch packages",
+            "message": str(e)
+        }), 500
+
 @admin_bp.route("/create-admin", methods=["POST"])
 def create_admin_user():
     """Create an admin user (for initial setup)"""
@@ -302,6 +372,7 @@ def create_admin_user():
         admin_user.set_password(password)
         
         db.session.add(admin_user)
+        bump_version('users')
         db.session.commit()
         
         return jsonify({
@@ -3,11 +3,11 @@ from flask import Blueprint, jsonify, request, session
 from flask_jwt_extended import create_access_token
 from models import db, User, FarmerApplication
 from config import Config
-from utils import generate_unique_filename, ensure_directory_exists
-from werkzeug.utils import secure_filename
+from utils import allowed_file
+from storage import store_file
+from http_cache import bump_version
+from routes.uploads import claim_upload
 from datetime import datetime
-import os
-from uuid import uuid4
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api')
 
@@ -26,6 +26,7 @@ def register():
             phone = request.form.get("phone", "")
             description = request.form.get("description", "")
             certification_file = request.files.get("certification")
+            certification_upload_id = request.form.get("certification_upload_id")
         else:
             data = request.get_json()
             username = data.get("username") if data else None
@@ -37,6 +38,7 @@ def register():
             phone = data.get("phone", "")
             description = data.get("description", "")
             certification_file = None
+            certification_upload_id = data.get("certification_upload_id") if data else None
         
         # Validate required fields
         if not username or not email or not password:
@@ -53,14 +55,14 @@ def register():
         
         # For farmers, require certification and create application instead of user
         if user_type == 'farmer':
-            if not certification_file:
+            if not certification_file and not certification_upload_id:
                 return jsonify({
                     "error": "Certification required",
                     "message": "Organic certification document is required for farmer registration"
                 }), 400
             
-            # Validate file type (PDF only)
-            if certification_file.filename.rsplit('.', 1)[1].lower() != 'pdf':
+            # Validate file type (PDF only; resumable uploads are checked when they start)
+            if certification_file and not allowed_file(certification_file.filename, {'pdf'}):
                 return jsonify({
                     "error": "Invalid file type",
                     "message": "Certification must be a PDF file"
@@ -90,11 +92,16 @@ def register():
                     "message": "This username or email is already registered"
                 }), 400
             
-            # Save certification file
-            cert_filename = f"cert_{uuid4().hex}_{secure_filename(certification_file.filename)}"
-            cert_path = os.path.join(Config.UPLOAD_FOLDER, 'certifications', cert_filename)
-            ensure_directory_exists(os.path.dirname(cert_path))
-            certification_file.save(cert_path)
+            if certification_file:
+                # Save certification file (content-addressed, so re-submitted documents are stored once)
+                cert_filename, _ = store_file(certification_file, 'pdf')
+            else:
+                cert_filename = claim_upload(certification_upload_id, 'certification')
+                if not cert_filename:
+                    return jsonify({
+                        "error": "Invalid upload",
+                        "message": "Certification upload not found, not completed or already used"
+                    }), 400
             
             # Create farmer application
             new_application = FarmerApplication(
@@ -141,6 +148,7 @@ def register():
         new_user.set_password(password)
         
         db.session.add(new_user)
+        bump_version('users')
         db.session.commit()
         
         # Store user info in session
@@ -0,0 +1,206 @@
+"""Server-side cart routes backed by time-limited stock reservations"""
+from flask import Blueprint, jsonify, request, session
+from sqlalchemy.orm import joinedload
+from models import db, Product, Reservation
+from reservations import available_quantities, hold, release
+from datetime import datetime
+
+cart_bp = Blueprint('cart', __name__, url_prefix='/api/cart')
+
+def _require_login():
+    if not session.get('logged_in'):
+        return jsonify({
+            "error": "Not authenticated",
+            "message": "Please login first"
+        }), 401
+    return None
+
+def _parse_quantity(value):
+    """A non-negative number, or None"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        return None
+    return value
+
+def _cart_response(user_id, unavailable=None):
+    """The buyer's active holds with product details and current available-to-sell"""
+    now = datetime.utcnow()
+    holds = Reservation.query.options(joinedload(Reservation.product).joinedload(Product.farmer)) \
+        .filter(Reservation.user_id == user_id, Reservation.expires_at > now) \
+        .order_by(Reservation.created_at) \
+        .all()
+    available = available_quantities([reservation.product_id for reservation in holds], user_id) if holds else {}
+    
+    items = []
+    for reservation in holds:
+        product = reservation.product
+        items.append({
+            'product_id': product.id,
+            'name': product.name,
+            'price': product.price,
+            'unit': product.unit,
+            'photo_url': product.photo_url(),
+            'farmer_id': product.farmer_id,
+            'farmer_username': product.farmer.username if product.farmer else None,
+            'quantity': reservation.quantity,
+            # Includes this buyer's own hold, i.e. what they could raise their quantity to
+            'available_quantity': available.get(product.id, 0),
+            'expires_at': reservation.expires_at.isoformat()
+        })
+    
+    response = {
+        "success": True,
+        "cart": {
+            "items": items,
+            "total": sum(item['price'] * item['quantity'] for item in items),
+            "expires_at": min(item['expires_at'] for item in items) if items else None
+        }
+    }
+    if unavailable is not None:
+        response["unavailable"] = unavailable
+    return response
+
+def _unavailable(user_id, product_id, requested):
+    return {
+        'product_id': product_id,
+        'requested': requested,
+        'available': available_quantities([product_id], user_id).get(product_id, 0)
+    }
+
+@cart_bp.route("", methods=["GET"])
+def get_cart():
+    """Get the logged-in buyer's cart (their active reservations)"""
+    error = _require_login()
+    if error:
+        return error
+    
+    try:
+        return jsonify(_cart_response(session.get('user_id'))), 200
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to fetch cart",
+            "message": str(e)
+        }), 500
+
+@cart_bp.route("", methods=["PUT"])
+def replace_cart():
+    """Replace the cart with `items` ([{id, quantity}]), holding stock for each line"""
+    error = _require_login()
+    if error:
+        return error
+    
+    try:
+        user_id = session.get('user_id')
+        data = request.get_json(silent=True)
+        items = data.get('items', []) if isinstance(data, dict) else None
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return jsonify({
+                "error": "Invalid cart item",
+                "message": "items must be a list of {id, quantity} objects"
+            }), 400
+        
+        quantities = {}
+        for item in items:
+            product_id = item.get('id')
+            quantity = _parse_quantity(item.get('quantity'))
+            if isinstance(product_id, bool) or not isinstance(product_id, int) or product_id <= 0 or quantity is None:
+                return jsonify({
+                    "error": "Invalid cart item",
+                    "message": "Each item needs an id and a non-negative quantity"
+                }), 400
+            if quantity > 0:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+        
+        release(user_id)
+        unavailable = [
+            _unavailable(user_id, product_id, quantity)
+            for product_id, quantity in quantities.items()
+            if not hold(user_id, product_id, quantity)
+        ]
+        db.session.commit()
+        
+        return jsonify(_cart_response(user_id, unavailable)), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to update cart",
+            "message": str(e)
+        }), 500
+
+@cart_bp.route("/items/<int:product_id>", methods=["PUT"])
+def set_cart_item(product_id):
+    """Hold `quantity` of a product (0 removes it); 409 if that much isn't available"""
+    error = _require_login()
+    if error:
+        return error
+    
+    try:
+        user_id = session.get('user_id')
+        data = request.get_json(silent=True)
+        quantity = _parse_quantity(data.get('quantity')) if isinstance(data, dict) else None
+        if quantity is None:
+            return jsonify({
+                "error": "Invalid quantity",
+                "message": "Quantity must be a non-negative number"
+            }), 400
+        
+        if quantity == 0:
+            release(user_id, [product_id])
+        elif not hold(user_id, product_id, quantity):
+            db.session.rollback()
+            unavailable = _unavailable(user_id, product_id, quantity)
+            return jsonify({
+                "error": "Insufficient stock",
+                "message": f"Only {unavailable['available']} available",
+                **unavailable
+            }), 409
+        db.session.commit()
+        
+        return jsonify(_cart_response(user_id)), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to update cart",
+            "message": str(e)
+        }), 500
+
+@cart_bp.route("/items/<int:product_id>", methods=["DELETE"])
+def remove_cart_item(product_id):
+    """Remove a product from the cart, releasing its hold"""
+    error = _require_login()
+    if error:
+        return error
+    
+    try:
+        user_id = session.get('user_id')
+        release(user_id, [product_id])
+        db.session.commit()
+        return jsonify(_cart_response(user_id)), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to update cart",
+            "message": str(e)
+        }), 500
+
+@cart_bp.route("", methods=["DELETE"])
+def clear_cart():
+    """Empty the cart, releasing all holds"""
+    error = _require_login()
+    if error:
+        return error
+    
+    try:
+        user_id = session.get('user_id')
+        release(user_id)
+        db.session.commit()
+        return jsonify(_cart_response(user_id)), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to clear cart",
+            "message": str(e)
+        }), 500
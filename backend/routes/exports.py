@@ -0,0 +1,144 @@
+"""Streaming NDJSON/CSV export routes (admin only)"""
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required
+from auth import user_type_required
+from models import db, User, Product, Order, OrderItem, FarmerRating
+from config import Config
+from sqlalchemy.orm import aliased
+from datetime import datetime
+from itertools import groupby
+import csv
+import io
+import json
+
+exports_bp = Blueprint('exports', __name__, url_prefix='/api/admin/export')
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+PRODUCT_FIELDS = ['id', 'farmer_id', 'farmer_username', 'name', 'description', 'price', 'quantity',
+                  'unit', 'category', 'location', 'is_available', 'created_at', 'updated_at']
+ORDER_FIELDS = ['id', 'user_id', 'user_username', 'total_amount', 'status', 'created_at']
+ORDER_ITEM_FIELDS = ['item_id', 'product_id', 'product_name', 'quantity', 'price']
+RATING_FIELDS = ['id', 'farmer_id', 'farmer_username', 'user_id', 'user_username', 'rating',
+                 'comment', 'created_at', 'updated_at']
+USER_FIELDS = ['id', 'username', 'email', 'user_type', 'created_at', 'is_active']
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _stream_rows(query):
+    """Iterate a column query in batches from the database cursor, never materializing the result"""
+    return query.yield_per(Config.EXPORT_BATCH_SIZE)
+
+def _export_response(name, fieldnames, records):
+    """
+    Stream dict records as NDJSON or CSV (`format` query parameter). Each line is
+    encoded and sent as soon as its row is read, so the first byte goes out
+    immediately and memory stays flat whatever the table size.
+    """
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in FORMATS:
+        return jsonify({
+            "error": "Invalid format",
+            "message": f"Format must be one of: {', '.join(FORMATS)}"
+        }), 400
+    
+    def generate():
+        if fmt == 'ndjson':
+            for record in records:
+                yield json.dumps(record, default=_json_default) + '\n'
+            return
+        
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            writer.writerow({key: _value(value) for key, value in record.items()})
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    response = Response(stream_with_context(generate()), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}_{timestamp}.{fmt}"'
+    return response
+
+@exports_bp.route("/products", methods=["GET"])
+@jwt_required()
+@user_type_required('admin')
+def export_products():
+    """Export all products with their farmer's username"""
+    query = db.session.query(
+        Product.id, Product.farmer_id, User.username.label('farmer_username'), Product.name,
+        Product.description, Product.price, Product.quantity, Product.unit, Product.category,
+        Product.location, Product.is_available, Product.created_at, Product.updated_at
+    ).outerjoin(User, User.id == Product.farmer_id).order_by(Product.id)
+    
+    return _export_response('products', PRODUCT_FIELDS, (row._asdict() for row in _stream_rows(query)))
+
+@exports_bp.route("/orders", methods=["GET"])
+@jwt_required()
+@user_type_required('admin')
+def export_orders():
+    """Export orders with their items as NDJSON or CSV"""
+    query = db.session.query(
+        Order.id, Order.user_id, User.username.label('user_username'), Order.total_amount,
+        Order.status, Order.created_at, OrderItem.id.label('item_id'), OrderItem.product_id,
+        Product.name.label('product_name'), OrderItem.quantity, OrderItem.price
+    ).outerjoin(User, User.id == Order.user_id) \
+     .outerjoin(OrderItem, OrderItem.order_id == Order.id) \
+     .outerjoin(Product, Product.id == OrderItem.product_id) \
+     .order_by(Order.id, OrderItem.id)
+    
+    rows = (row._asdict() for row in _stream_rows(query))
+    
+    if request.args.get('format', 'ndjson').lower() == 'csv':
+        return _export_response('orders', ORDER_FIELDS + ORDER_ITEM_FIELDS, rows)
+    
+    def orders_with_items():
+        # Rows arrive ordered by order id, so each order's items are consecutive
+        for _, order_rows in groupby(rows, key=lambda row: row['id']):
+            order_rows = list(order_rows)
+            order = {field: order_rows[0][field] for field in ORDER_FIELDS}
+            order['items'] = [
+                {field: row[field] for field in ORDER_ITEM_FIELDS}
+                for row in order_rows if row['item_id'] is not None
+            ]
+            yield order
+    
+    return _export_response('orders', ORDER_FIELDS, orders_with_items())
+
+@exports_bp.route("/ratings", methods=["GET"])
+@jwt_required()
+@user_type_required('admin')
+def export_ratings():
+    """Export all farmer ratings with farmer and rater usernames"""
+    farmer = aliased(User)
+    rater = aliased(User)
+    query = db.session.query(
+        FarmerRating.id, FarmerRating.farmer_id, farmer.username.label('farmer_username'),
+        FarmerRating.user_id, rater.username.label('user_username'), FarmerRating.rating,
+        FarmerRating.comment, FarmerRating.created_at, FarmerRating.updated_at
+    ).outerjoin(farmer, farmer.id == FarmerRating.farmer_id) \
+     .outerjoin(rater, rater.id == FarmerRating.user_id) \
+     .order_by(FarmerRating.id)
+    
+    return _export_response('ratings', RATING_FIELDS, (row._asdict() for row in _stream_rows(query)))
+
+@exports_bp.route("/users", methods=["GET"])
+@jwt_required()
+@user_type_required('admin')
+def export_users():
+    """Export all users (never includes password hashes)"""
+    query = db.session.query(
+        User.id, User.username, User.email, User.user_type, User.created_at, User.is_active
+    ).order_by(User.id)
+    
+    return _export_response('users', USER_FIELDS, (row._asdict() for row in _stream_rows(query)))
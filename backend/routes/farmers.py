@@ -2,9 +2,15 @@
 from flask import Blueprint, jsonify, request, send_from_directory, session
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from auth import user_type_required
-from models import db, FarmerApplication, User, FarmerRating
+from models import db, FarmerApplication, User, FarmerRating, FarmerRatingStats, Product, SalesDaily
 from config import Config
-from datetime import datetime
+from http_cache import bump_version, conditional_response
+from rating_stats import record_rating
+from leaderboard import leaderboard
+from storage import is_object_key
+from utils import parse_limit, keyset_paginate
+from sqlalchemy.orm import contains_eager
+from datetime import date, datetime, timedelta
 import os
 
 farmers_bp = Blueprint('farmers', __name__, url_prefix='/api/farmers')
@@ -27,7 +33,11 @@ def get_farmer_certification(application_id):
                 "error": "No certification file found"
             }), 404
         
-        cert_path = os.path.join(Config.UPLOAD_FOLDER, 'certifications', application.certification_filename)
+        if is_object_key(application.certification_filename):
+            cert_path = os.path.join(Config.UPLOAD_FOLDER, application.certification_filename)
+        else:
+            # Uploaded before the content-addressed store existed
+            cert_path = os.path.join(Config.UPLOAD_FOLDER, 'certifications', application.certification_filename)
         
         if not os.path.exists(cert_path):
             return jsonify({
@@ -47,6 +57,77 @@ def get_farmer_certification(application_id):
             "message": str(e)
         }), 500
 
+@farmers_bp.route("/ratings", methods=["GET"])
+@conditional_response('ratings', 'users')
+def get_farmer_ratings_batch():
+    """Get rating summaries for many farmers at once (`ids=1,2,3`)"""
+    try:
+        raw_ids = [part.strip() for part in request.args.get('ids', '').split(',') if part.strip()]
+        try:
+            farmer_ids = list(dict.fromkeys(int(part) for part in raw_ids))
+        except ValueError:
+            return jsonify({
+                "error": "Invalid ids",
+                "message": "ids must be a comma-separated list of farmer ids"
+            }), 400
+        
+        if not farmer_ids:
+            return jsonify({
+                "error": "Missing ids",
+                "message": "Please provide farmer ids as 'ids=1,2,3'"
+            }), 400
+        
+        if len(farmer_ids) > Config.FARMER_RATINGS_BATCH_MAX:
+            return jsonify({
+                "error": "Too many ids",
+                "message": f"At most {Config.FARMER_RATINGS_BATCH_MAX} farmers per request"
+            }), 400
+        
+        rows = db.session.query(User.id, User.username, FarmerRatingStats) \
+            .outerjoin(FarmerRatingStats, FarmerRatingStats.farmer_id == User.id) \
+            .filter(User.id.in_(farmer_ids), User.user_type == 'farmer') \
+            .all()
+        
+        ratings = {}
+        for farmer_id, username, stats in rows:
+            ratings[farmer_id] = {
+                "farmer_id": farmer_id,
+                "farmer_username": username,
+                "average_rating": stats.average() if stats else None,
+                "total_ratings": stats.rating_count if stats else 0,
+                "rating_distribution": stats.distribution() if stats else {i: 0 for i in range(1, 6)}
+            }
+        
+        return jsonify({
+            "success": True,
+            "count": len(ratings),
+            "ratings": ratings,
+            "not_found": [farmer_id for farmer_id in farmer_ids if farmer_id not in ratings]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to fetch ratings",
+            "message": str(e)
+        }), 500
+
+@farmers_bp.route("/leaderboard", methods=["GET"])
+def get_farmer_leaderboard():
+    """Get the top-rated farmers, optionally by product category and/or location"""
+    limit = parse_limit(request.args.get('limit'), Config.LEADERBOARD_DEFAULT_LIMIT, Config.LEADERBOARD_MAX_LIMIT)
+    category = request.args.get('category', '').strip() or None
+    location = request.args.get('location', '').strip() or None
+    
+    farmers = leaderboard.top(limit, category=category, location=location)
+    
+    return jsonify({
+        "success": True,
+        "count": len(farmers),
+        "category": category,
+        "location": location,
+        "farmers": farmers
+    }), 200
+
 @farmers_bp.route("/<int:farmer_id>/rate", methods=["POST"])
 def rate_farmer(farmer_id):
     """Rate a farmer (1-5 stars) - requires authentication"""
@@ -126,12 +207,18 @@ def rate_farmer(farmer_id):
         ).first()
         
         if existing_rating:
-            # Update existing rating
+            # Update existing rating; the stats are adjusted from the flushed row
+            old_rating = existing_rating.rating
             existing_rating.rating = rating_value
             existing_rating.comment = comment
             existing_rating.updated_at = datetime.utcnow()
+            db.session.flush()
+            record_rating(farmer_id, rating_value, old_rating=old_rating)
+            bump_version('ratings')
             db.session.commit()
             
+            leaderboard.refresh_farmer(farmer_id)
+            
             return jsonify({
                 "success": True,
                 "message": "Rating updated successfully",
@@ -146,8 +233,13 @@ def rate_farmer(farmer_id):
                 comment=comment
             )
             db.session.add(new_rating)
+            db.session.flush()
+            record_rating(farmer_id, rating_value)
+            bump_version('ratings')
             db.session.commit()
             
+            leaderboard.refresh_farmer(farmer_id)
+            
             return jsonify({
                 "success": True,
                 "message": "Rating submitted successfully",
@@ -162,9 +254,17 @@ def rate_farmer(farmer_id):
         }), 500
 
 @farmers_bp.route("/<int:farmer_id>/rating", methods=["GET"])
+@conditional_response('ratings', 'users', per_user=True)
 def get_farmer_rating(farmer_id):
     """Get rating information for a farmer"""
     try:
+        mode = request.args.get('mode', 'full')
+        if mode not in ('summary', 'full'):
+            return jsonify({
+                "error": "Invalid mode",
+                "message": "Mode must be 'summary' or 'full'"
+            }), 400
+        
         # Get farmer
         farmer = User.query.get(farmer_id)
         if not farmer:
@@ -203,35 +303,44 @@ def get_farmer_rating(farmer_id):
             if user_rating_obj:
                 user_rating = user_rating_obj.to_dict()
         
-        # Get all ratings
-        all_ratings = FarmerRating.query.filter_by(farmer_id=farmer_id).order_by(
-            FarmerRating.created_at.desc()
-        ).all()
-        
-        # Calculate statistics
-        from sqlalchemy import func
-        avg_rating = db.session.query(func.avg(FarmerRating.rating)).filter(
-            FarmerRating.farmer_id == farmer_id
-        ).scalar()
-        
-        rating_distribution = {}
-        for i in range(1, 6):
-            count = FarmerRating.query.filter_by(
-                farmer_id=farmer_id,
-                rating=i
-            ).count()
-            rating_distribution[i] = count
+        # Aggregates are maintained on every rating write, so this is one primary-key lookup
+        stats = FarmerRatingStats.query.get(farmer_id) or FarmerRatingStats(farmer_id=farmer_id)
         
-        return jsonify({
+        response = {
             "success": True,
             "farmer_id": farmer_id,
             "farmer_username": farmer.username,
-            "average_rating": round(float(avg_rating), 2) if avg_rating else None,
-            "total_ratings": len(all_ratings),
-            "rating_distribution": rating_distribution,
-            "user_rating": user_rating,
-            "ratings": [rating.to_dict() for rating in all_ratings]
-        }), 200
+            "average_rating": stats.average(),
+            "total_ratings": stats.rating_count or 0,
+            "rating_distribution": {i: count or 0 for i, count in stats.distribution().items()},
+            "user_rating": user_rating
+        }
+        
+        if mode == 'summary':
+            return jsonify(response), 200
+        
+        limit = parse_limit(request.args.get('limit'), Config.RATINGS_PAGE_SIZE, Config.RATINGS_MAX_PAGE_SIZE)
+        
+        # Raters' usernames come from the same query (null once a rater is deleted); the farmer is already in the session
+        query = FarmerRating.query.outerjoin(FarmerRating.user) \
+            .options(contains_eager(FarmerRating.user)) \
+            .filter(FarmerRating.farmer_id == farmer_id)
+        
+        try:
+            ratings, next_cursor = keyset_paginate(query, FarmerRating, request.args.get('cursor'), limit)
+        except ValueError:
+            return jsonify({
+                "error": "Invalid cursor",
+                "message": "The 'cursor' parameter is malformed"
+            }), 400
+        
+        response.update({
+            "ratings": [rating.to_dict() for rating in ratings],
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        })
+        return jsonify(response), 200
     
     except Exception as e:
         return jsonify({
@@ -283,3 +392,94 @@ def get_farmer_ratings_list(farmer_id):
             "message": str(e)
         }), 500
 
+
+@farmers_bp.route("/<int:farmer_id>/sales", methods=["GET"])
+def get_farmer_sales(farmer_id):
+    """Get a farmer's daily sales per product (for the farmer or an admin)"""
+    try:
+        if not session.get('logged_in'):
+            return jsonify({
+                "error": "Not authenticated",
+                "message": "Please login first"
+            }), 401
+        
+        if session.get('user_id') != farmer_id and session.get('user_type') != 'admin':
+            return jsonify({
+                "error": "Unauthorized",
+                "message": "You can only view your own sales"
+            }), 403
+        
+        try:
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow().date()
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') \
+                else end - timedelta(days=Config.SALES_DEFAULT_DAYS - 1)
+            product_id = request.args.get('product_id', type=int)
+        except ValueError:
+            return jsonify({
+                "error": "Invalid date",
+                "message": "Dates must be in YYYY-MM-DD format"
+            }), 400
+        
+        if start > end or (end - start).days + 1 > Config.SALES_MAX_DAYS:
+            return jsonify({
+                "error": "Invalid date range",
+                "message": f"'from' must not be after 'to', and the range is limited to {Config.SALES_MAX_DAYS} days"
+            }), 400
+        
+        query = db.session.query(SalesDaily, Product.name) \
+            .outerjoin(Product, Product.id == SalesDaily.product_id) \
+            .filter(SalesDaily.farmer_id == farmer_id, SalesDaily.day >= start, SalesDaily.day <= end)
+        if product_id:
+            query = query.filter(SalesDaily.product_id == product_id)
+        
+        rows = []
+        days = {}
+        products = {}
+        for sales, product_name in query.order_by(SalesDaily.day, SalesDaily.product_id):
+            day = sales.day.isoformat()
+            rows.append({
+                'day': day,
+                'product_id': sales.product_id,
+                'product_name': product_name,
+                'units': sales.units,
+                'revenue': round(sales.revenue, 2),
+                'order_count': sales.order_count
+            })
+            
+            day_totals = days.setdefault(day, {'day': day, 'units': 0, 'revenue': 0})
+            day_totals['units'] += sales.units
+            day_totals['revenue'] += sales.revenue
+            
+            product_totals = products.setdefault(sales.product_id, {
+                'product_id': sales.product_id,
+                'product_name': product_name,
+                'units': 0,
+                'revenue': 0,
+                'order_count': 0
+            })
+            product_totals['units'] += sales.units
+            product_totals['revenue'] += sales.revenue
+            product_totals['order_count'] += sales.order_count
+        
+        for totals in list(days.values()) + list(products.values()):
+            totals['revenue'] = round(totals['revenue'], 2)
+        
+        return jsonify({
+            "success": True,
+            "farmer_id": farmer_id,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "totals": {
+                "units": sum(totals['units'] for totals in products.values()),
+                "revenue": round(sum(totals['revenue'] for totals in products.values()), 2)
+            },
+            "daily": list(days.values()),
+            "products": sorted(products.values(), key=lambda totals: totals['revenue'], reverse=True),
+            "rows": rows
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to fetch sales",
+            "message": str(e)
+        }), 500
@@ -2,10 +2,23 @@
 from flask import Blueprint, jsonify, request, session
 from models import db, User, Product, Order, OrderItem
 from datetime import datetime
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import joinedload, selectinload
+from suggest import suggestion_index
+from fuzzy import trigram_index
+from http_cache import bump_version
+from fragment_cache import product_fragments
+from idempotency import idempotent
+from reservations import held_quantity, release
+from sales_rollup import record_sales
+from outbox import emit, notify
+from utils import keyset_paginate, parse_limit
+from config import Config
 
 orders_bp = Blueprint('orders', __name__, url_prefix='/api/orders')
 
 @orders_bp.route("", methods=["POST"])
+@idempotent
 def create_order():
     """Create a new order from cart items"""
     try:
@@ -17,55 +30,100 @@ def create_order():
             }), 401
         
         user_id = session.get('user_id')
-        data = request.get_json()
-        cart_items = data.get('items', [])
+        data = request.get_json(silent=True)
+        cart_items = data.get('items', []) if isinstance(data, dict) else None
+        
+        if not isinstance(cart_items, list) or not all(isinstance(item, dict) for item in cart_items):
+            return jsonify({
+                "error": "Invalid cart item",
+                "message": "items must be a list of {id, quantity} objects"
+            }), 400
         
         if not cart_items:
             return jsonify({
                 "error": "Empty cart",
                 "message": "Cannot create order with empty cart"
             }), 400
-            
-        # Calculate total and verify items
-        total_amount = 0
-        order_items = []
         
+        # Merge repeated lines for the same product
+        quantities = {}
         for item in cart_items:
             product_id = item.get('id')
             quantity = item.get('quantity')
             
-            if not product_id or not quantity:
-                continue
-                
-            product = Product.query.get(product_id)
-            if not product:
-                continue
-                
-            # Check availability
-            if not product.is_available or product.quantity < quantity:
+            if isinstance(product_id, bool) or not isinstance(product_id, int) or product_id <= 0:
+                return jsonify({
+                    "error": "Invalid cart item",
+                    "message": "Each item needs a positive integer product id"
+                }), 400
+            
+            if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity <= 0:
+                return jsonify({
+                    "error": "Invalid quantity",
+                    "message": "Quantities must be positive numbers"
+                }), 400
+            
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        
+        products = {
+            product.id: product
+            for product in Product.query.filter(Product.id.in_(list(quantities))).all()
+        }
+        
+        missing = sorted(set(quantities) - set(products))
+        if missing:
+            return jsonify({
+                "error": "Product not found",
+                "message": "Some cart items are not products",
+                "missing_product_ids": missing
+            }), 400
+        
+        # Calculate total and take stock; in id order so concurrent orders lock rows consistently
+        total_amount = 0
+        order_items = []
+        now = datetime.utcnow()
+        
+        for product_id in sorted(products):
+            product = products[product_id]
+            quantity = quantities[product_id]
+            
+            # Other buyers' active cart holds are not for sale; the buyer's own holds are consumed below
+            remaining = Product.quantity - quantity
+            taken = db.session.execute(
+                update(Product)
+                .where(
+                    Product.id == product_id,
+                    Product.is_available == True,
+                    Product.quantity - held_quantity(Product.id, now, exclude_user_id=user_id) >= quantity
+                )
+                .values(quantity=remaining, is_available=case((remaining > 0, True), else_=False), updated_at=now)
+                .returning(Product.quantity, Product.is_available)
+                .execution_options(synchronize_session=False)
+            ).first()
+            
+            if taken is None:
+                db.session.rollback()
                 return jsonify({
                     "error": "Product unavailable",
                     "message": f"Product {product.name} is not available in requested quantity"
                 }), 400
-                
-            # Update product quantity
-            product.quantity -= quantity
-            if product.quantity <= 0:
-                product.is_available = False
-                
+            
             total_amount += product.price * quantity
             
             order_items.append({
-                'product': product,
+                'product_id': product_id,
+                'farmer_id': product.farmer_id,
                 'quantity': quantity,
-                'price': product.price
+                'price': product.price,
+                'is_available': taken.is_available
             })
-            
+        
         # Create Order
         new_order = Order(
             user_id=user_id,
             total_amount=total_amount,
-            status='pending'
+            status='pending',
+            created_at=now
         )
         db.session.add(new_order)
         db.session.flush() # Get ID
@@ -74,20 +132,42 @@ def create_order():
         for item in order_items:
             order_item = OrderItem(
                 order_id=new_order.id,
-                product_id=item['product'].id,
+                product_id=item['product_id'],
                 quantity=item['quantity'],
                 price=item['price']
             )
             db.session.add(order_item)
-            
+        
+        # Farmers' daily sales rollup moves with the order
+        record_sales(now.date(), [
+            (item['farmer_id'], item['product_id'], item['quantity'], item['price'] * item['quantity'])
+            for item in order_items
+        ])
+        
+        # Follow-up work (farmer notifications, ...) runs in the outbox workers once this commits
+        emit('order.created', {'order_id': new_order.id, 'user_id': user_id})
+        
+        # The buyer's holds on these products became the order
+        release(user_id, [item['product_id'] for item in order_items])
+        
+        # Stock levels changed, so cached product responses are stale
+        bump_version('products')
         db.session.commit()
+        notify()
+        
+        for item in order_items:
+            product_fragments.invalidate(item['product_id'])
+            suggestion_index.record_order(item['product_id'])
+            if not item['is_available']:
+                suggestion_index.set_available(item['product_id'], False)
+                trigram_index.remove_product(item['product_id'])
         
         return jsonify({
             "success": True,
             "message": "Order created successfully",
             "order": new_order.to_dict()
         }), 201
-
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -104,17 +184,63 @@ def get_orders():
                 "error": "Not authenticated",
                 "message": "Please login first"
             }), 401
-            
+        
+        mode = request.args.get('mode', 'full')
+        if mode not in ('summary', 'full'):
+            return jsonify({
+                "error": "Invalid mode",
+                "message": "Mode must be 'summary' or 'full'"
+            }), 400
+        
         user_id = session.get('user_id')
+        limit = parse_limit(request.args.get('limit'), Config.ORDERS_PAGE_SIZE, Config.ORDERS_MAX_PAGE_SIZE)
         
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
+        if mode == 'summary':
+            query = db.session.query(
+                Order.id,
+                Order.total_amount,
+                Order.status,
+                Order.created_at,
+                func.count(OrderItem.id).label('item_count'),
+                func.coalesce(func.sum(OrderItem.quantity), 0).label('total_quantity')
+            ).outerjoin(OrderItem, OrderItem.order_id == Order.id) \
+                .filter(Order.user_id == user_id) \
+                .group_by(Order.id)
+        else:
+            query = Order.query.options(
+                joinedload(Order.user),
+                selectinload(Order.items).selectinload(OrderItem.product)
+            ).filter(Order.user_id == user_id)
+        
+        try:
+            orders, next_cursor = keyset_paginate(query, Order, request.args.get('cursor'), limit)
+        except ValueError:
+            return jsonify({
+                "error": "Invalid cursor",
+                "message": "The 'cursor' parameter is malformed"
+            }), 400
+        
+        if mode == 'summary':
+            orders = [{
+                'id': row.id,
+                'total_amount': row.total_amount,
+                'status': row.status,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'item_count': row.item_count,
+                'total_quantity': row.total_quantity
+            } for row in orders]
+        else:
+            orders = [order.to_dict() for order in orders]
         
         return jsonify({
             "success": True,
             "count": len(orders),
-            "orders": [order.to_dict() for order in orders]
+            "orders": orders,
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         }), 200
-
+    
     except Exception as e:
         return jsonify({
             "error": "Failed to fetch orders",
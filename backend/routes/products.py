@@ -1,30 +1,78 @@
 """Product routes"""
-from flask import Blueprint, jsonify, request, session, send_from_directory
+from flask import Blueprint, current_app, jsonify, request, session, send_from_directory
 from models import db, User, Product
 from config import Config
-from utils import allowed_file, generate_unique_filename, get_mime_type, ensure_directory_exists
-from uuid import uuid4
+from utils import allowed_file, get_mime_type, parse_limit, keyset_paginate
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import contains_eager, joinedload
+import search
+import geo
+from suggest import suggestion_index
+from fuzzy import trigram_index
+from leaderboard import leaderboard
+from http_cache import bump_version, conditional_response
+from fragment_cache import product_fragments, splice_fields, splice_json
+from reservations import available_quantities, available_quantity
+from images import schedule_variants, variant_filename
+from storage import store_file, key_from_name
+from routes.uploads import claim_upload
+from bulk_import import import_products, FORMATS as IMPORT_FORMATS
 import os
 
 products_bp = Blueprint('products', __name__, url_prefix='/api/products')
 
 @products_bp.route("", methods=["GET", "POST"])
+@conditional_response('products', 'reservations', per_user=True)
 def handle_products():
     """Handle product creation and listing"""
     if request.method == "GET":
         try:
-            products = Product.query.filter_by(is_available=True).order_by(Product.created_at.desc()).all()
-            return jsonify({
+            limit = parse_limit(request.args.get('limit'), Config.PRODUCTS_PAGE_SIZE, Config.PRODUCTS_MAX_PAGE_SIZE)
+            cursor = request.args.get('cursor')
+            
+            try:
+                conditions = _catalogue_filters(request.args)
+            except ValueError:
+                return jsonify({
+                    "error": "Invalid filter",
+                    "message": "min_price and max_price must be numbers"
+                }), 400
+            
+            if request.args.get('near'):
+                return _nearby_products(conditions, limit)
+            
+            # Page over (id, version) only; full rows are loaded just for fragment cache misses
+            query = db.session.query(Product.id, Product.created_at, Product.updated_at).filter(*conditions)
+            
+            try:
+                rows, next_cursor = keyset_paginate(query, Product, cursor, limit)
+            except ValueError:
+                return jsonify({
+                    "error": "Invalid cursor",
+                    "message": "The 'cursor' parameter is malformed"
+                }), 400
+            
+            fragments = _product_fragments(rows)
+            
+            envelope = {
                 "success": True,
-                "count": len(products),
-                "products": [product.to_dict() for product in products]
-            }), 200
+                "count": len(fragments),
+                "limit": limit,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
+            }
+            
+            # Facets describe the whole filtered set, so they are only computed for the first page
+            if not cursor and request.args.get('facets', '1') != '0':
+                envelope["facets"] = _catalogue_facets(conditions)
+            
+            return _fragment_response(envelope, fragments), 200
         except Exception as e:
             return jsonify({
                 "error": "Failed to fetch products",
                 "message": str(e)
             }), 500
-            
+    
     # POST request (Create Product)
     try:
         # Check if user is logged in via session
@@ -80,15 +128,36 @@ def handle_products():
                 "message": "Price and quantity must be numbers"
             }), 400
         
+        # Explicit coordinates win; otherwise the location is looked up in the offline gazetteer
+        try:
+            coordinates = geo.resolve_coordinates(
+                location, request.form.get('latitude'), request.form.get('longitude')
+            )
+        except ValueError:
+            return jsonify({
+                "error": "Invalid data",
+                "message": "Latitude must be within [-90, 90] and longitude within [-180, 180]"
+            }), 400
+        latitude, longitude = coordinates or (None, None)
+        
         # Handle photo upload
         photo_filename = None
         if 'photo' in request.files:
             file = request.files['photo']
-            if file and file.filename != '' and allowed_file(file.filename, Config.ALLOWED_EXTENSIONS):
-                photo_filename = generate_unique_filename(file.filename)
-                file_path = os.path.join(Config.UPLOAD_FOLDER, photo_filename)
-                ensure_directory_exists(Config.UPLOAD_FOLDER)
-                file.save(file_path)
+            if file and file.filename != '' and allowed_file(file.filename, Config.ALLOWED_IMAGE_EXTENSIONS):
+                photo_filename, created = store_file(file, file.filename.rsplit('.', 1)[1])
+                # Resized variants are produced in the background; the original is served until they exist.
+                # A duplicate upload already has them.
+                if created:
+                    schedule_variants(photo_filename)
+        elif request.form.get('photo_upload_id'):
+            # Photo sent beforehand through the resumable upload API
+            photo_filename = claim_upload(request.form.get('photo_upload_id'), 'photo')
+            if not photo_filename:
+                return jsonify({
+                    "error": "Invalid upload",
+                    "message": "Photo upload not found, not completed or already used"
+                }), 400
         
         # Create product
         new_product = Product(
@@ -100,12 +169,19 @@ def handle_products():
             unit=unit,
             category=category,
             location=location,
+            latitude=latitude,
+            longitude=longitude,
             photo_filename=photo_filename
         )
         
         db.session.add(new_product)
+        bump_version('products')
         db.session.commit()
         
+        suggestion_index.add_product(new_product)
+        trigram_index.add_product(new_product)
+        leaderboard.add_product(new_product)
+        
         return jsonify({
             "success": True,
             "message": "Product created successfully",
@@ -119,6 +195,106 @@ def handle_products():
             "message": str(e)
         }), 500
 
+@products_bp.route("/import", methods=["POST"])
+def bulk_import_products():
+    """Bulk-create products from an uploaded CSV or NDJSON file"""
+    try:
+        if not session.get('logged_in', False):
+            return jsonify({
+                "error": "Not authenticated",
+                "message": "Please login first"
+            }), 401
+        
+        if session.get('user_type') != 'farmer':
+            return jsonify({
+                "error": "Unauthorized",
+                "message": "Only farmers can import products"
+            }), 403
+        
+        farmer = User.query.get(session.get('user_id'))
+        if not farmer or farmer.user_type != 'farmer':
+            return jsonify({
+                "error": "Invalid session",
+                "message": "Farmer account not found or invalid"
+            }), 403
+        
+        file = request.files.get('file')
+        if not file or file.filename == '':
+            return jsonify({
+                "error": "Missing file",
+                "message": "Upload a CSV or NDJSON file as 'file'"
+            }), 400
+        
+        fmt = (request.form.get('format') or file.filename.rsplit('.', 1)[-1]).lower()
+        if fmt in ('jsonl', 'json'):
+            fmt = 'ndjson'
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({
+                "error": "Invalid format",
+                "message": f"Format must be one of: {', '.join(IMPORT_FORMATS)}"
+            }), 400
+        
+        result = import_products(farmer.id, file.stream, fmt)
+        
+        if not result['imported'] and not result['failed']:
+            return jsonify({
+                "success": False,
+                "error": "Empty file",
+                "message": "The file contains no product rows",
+                **result
+            }), 400
+        
+        return jsonify({
+            "success": result['imported'] > 0,
+            **result
+        }), 201 if result['imported'] else 400
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Import failed",
+            "message": str(e)
+        }), 500
+
+@products_bp.route("/photos/<string:name>", methods=["GET"])
+def get_stored_photo(name):
+    """Serve a content-addressed product photo"""
+    key = key_from_name(name)
+    if not key or name.rsplit('.', 1)[1] not in Config.ALLOWED_IMAGE_EXTENSIONS:
+        return jsonify({
+            "error": "Photo not found"
+        }), 404
+    
+    size = request.args.get('size')
+    if size and size not in Config.PHOTO_VARIANTS:
+        return jsonify({
+            "error": "Invalid size",
+            "message": f"Size must be one of: {', '.join(Config.PHOTO_VARIANTS)}"
+        }), 400
+    
+    filename = key
+    if size and os.path.exists(os.path.join(Config.UPLOAD_FOLDER, variant_filename(key, size))):
+        filename = variant_filename(key, size)
+    
+    if not os.path.exists(os.path.join(Config.UPLOAD_FOLDER, filename)):
+        return jsonify({
+            "error": "Photo not found"
+        }), 404
+    
+    response = send_from_directory(
+        Config.UPLOAD_FOLDER,
+        filename,
+        as_attachment=False,
+        mimetype=get_mime_type(filename)
+    )
+    # A pending variant falls back to the original, which must not be cached forever under this URL
+    if filename == key and size:
+        response.headers['Cache-Control'] = 'public, max-age=60'
+    else:
+        response.headers['Cache-Control'] = Config.IMMUTABLE_CACHE_CONTROL
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
 @products_bp.route("/<int:product_id>/photo", methods=["GET"])
 def get_product_photo(product_id):
     """Get product photo by product ID"""
@@ -144,11 +320,24 @@ def get_product_photo(product_id):
                 "path": photo_path
             }), 404
         
-        mimetype = get_mime_type(product.photo_filename)
+        filename = product.photo_filename
+        size = request.args.get('size')
+        if size:
+            if size not in Config.PHOTO_VARIANTS:
+                return jsonify({
+                    "error": "Invalid size",
+                    "message": f"Size must be one of: {', '.join(Config.PHOTO_VARIANTS)}"
+                }), 400
+            
+            variant = variant_filename(product.photo_filename, size)
+            if os.path.exists(os.path.join(Config.UPLOAD_FOLDER, variant)):
+                filename = variant
+        
+        mimetype = get_mime_type(filename)
         
         response = send_from_directory(
             Config.UPLOAD_FOLDER,
-            product.photo_filename,
+            filename,
             as_attachment=False,
             mimetype=mimetype
         )
@@ -167,10 +356,16 @@ def get_product_photo(product_id):
         }), 500
 
 @products_bp.route("/<int:product_id>", methods=["GET"])
+@conditional_response('products', 'ratings', 'users', 'reservations', per_user=True)
 def get_product(product_id):
     """Get product details by ID with farmer rating information"""
     try:
-        product = Product.query.get(product_id)
+        product = Product.query \
+            .outerjoin(Product.farmer) \
+            .outerjoin(User.rating_stats) \
+            .options(contains_eager(Product.farmer).contains_eager(User.rating_stats)) \
+            .filter(Product.id == product_id) \
+            .first()
         
         if not product:
             return jsonify({
@@ -184,9 +379,10 @@ def get_product(product_id):
         
         # Get product data
         product_data = product.to_dict()
+        product_data['available_quantity'] = available_quantity(product, _viewer_id())
         
         # Get farmer information with rating
-        farmer = User.query.get(product.farmer_id)
+        farmer = product.farmer
         if farmer:
             farmer_data = farmer.to_dict()
             product_data['farmer'] = farmer_data
@@ -202,9 +398,21 @@ def get_product(product_id):
             "message": str(e)
         }), 500
 
+@products_bp.route("/suggest", methods=["GET"])
+def suggest_products():
+    """Typeahead suggestions for product names and categories, served from memory"""
+    prefix = request.args.get('q', '').strip()
+    limit = parse_limit(request.args.get('limit'), Config.SUGGEST_DEFAULT_LIMIT, Config.SUGGEST_MAX_LIMIT)
+    
+    return jsonify({
+        "success": True,
+        "query": prefix,
+        "suggestions": suggestion_index.suggest(prefix, limit)
+    }), 200
+
 @products_bp.route("/search", methods=["GET"])
 def search_products():
-    """Search for products by name"""
+    """Search available products by name, category and description"""
     try:
         search_query = request.args.get('q', '').strip()
         
@@ -214,18 +422,31 @@ def search_products():
                 "message": "Please provide a search query parameter 'q'"
             }), 400
         
-        # Search products by name (case-insensitive partial match)
-        products = Product.query.filter(
-            Product.name.ilike(f'%{search_query}%'),
-            Product.is_available == True
-        ).all()
+        limit = parse_limit(request.args.get('limit'), Config.SEARCH_DEFAULT_LIMIT, Config.SEARCH_MAX_LIMIT)
         
-        return jsonify({
+        fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+        
+        if fuzzy:
+            matches = trigram_index.search(search_query, limit)
+            rows = _ranked_versions([product_id for product_id, _ in matches])
+        elif search.fts_enabled:
+            rows = _ranked_versions(search.search_product_ids(search_query, limit))
+        else:
+            # Fallback when SQLite was built without FTS5
+            pattern = f'%{search_query}%'
+            rows = db.session.query(Product.id, Product.updated_at).filter(
+                or_(Product.name.ilike(pattern), Product.category.ilike(pattern), Product.description.ilike(pattern)),
+                Product.is_available == True
+            ).limit(limit).all()
+        
+        fragments = _product_fragments(rows)
+        
+        return _fragment_response({
             "success": True,
             "query": search_query,
-            "count": len(products),
-            "products": [product.to_dict() for product in products]
-        }), 200
+            "fuzzy": fuzzy,
+            "count": len(fragments)
+        }, fragments), 200
     
     except Exception as e:
         return jsonify({
@@ -233,3 +454,137 @@ def search_products():
             "message": str(e)
         }), 500
 
+def _catalogue_filters(args):
+    """Build catalogue filter conditions from query parameters. Raises ValueError for non-numeric prices"""
+    conditions = [Product.is_available == True]
+    
+    for field in ('category', 'location', 'unit'):
+        value = args.get(field, '').strip()
+        if value:
+            conditions.append(getattr(Product, field) == value)
+    
+    min_price = args.get('min_price', '').strip()
+    if min_price:
+        conditions.append(Product.price >= float(min_price))
+    
+    max_price = args.get('max_price', '').strip()
+    if max_price:
+        conditions.append(Product.price <= float(max_price))
+    
+    return conditions
+
+def _catalogue_facets(conditions):
+    """
+    Count filtered products per category, per location and per price bucket.
+    One GROUP BY over (category, location, bucket) returns every combination's
+    count; each facet is then a sum over that small result in Python.
+    """
+    edges = Config.PRICE_FACET_BUCKETS
+    bucket = case(
+        *[(Product.price < upper, i) for i, upper in enumerate(edges[1:])],
+        else_=len(edges) - 1
+    )
+    
+    rows = db.session.query(
+        Product.category, Product.location, bucket, func.count(Product.id)
+    ).filter(*conditions).group_by(Product.category, Product.location, bucket)
+    
+    categories = {}
+    locations = {}
+    price_counts = [0] * len(edges)
+    total = 0
+    for category, location, bucket_index, count in rows:
+        categories[category] = categories.get(category, 0) + count
+        locations[location] = locations.get(location, 0) + count
+        price_counts[bucket_index] += count
+        total += count
+    
+    def ranked(counts):
+        return [
+            {"value": value, "count": count}
+            for value, count in sorted(counts.items(), key=lambda item: (-item[1], item[0] or ''))
+        ]
+    
+    return {
+        "total": total,
+        "category": ranked(categories),
+        "location": ranked(locations),
+        "price": [
+            {
+                "min": lower,
+                "max": edges[i + 1] if i + 1 < len(edges) else None,
+                "count": price_counts[i]
+            }
+            for i, lower in enumerate(edges)
+        ]
+    }
+
+def _nearby_products(conditions, limit):
+    """Response for `near=lat,lon&radius=km`: filtered products inside the radius, nearest first"""
+    try:
+        lat, lon = geo.parse_point(*request.args.get('near').split(','))
+        radius = float(request.args.get('radius', Config.GEO_DEFAULT_RADIUS_KM))
+        if not 0 < radius <= Config.GEO_MAX_RADIUS_KM:
+            raise ValueError("radius out of range")
+    except (TypeError, ValueError):
+        return jsonify({
+            "error": "Invalid location",
+            "message": f"near must be 'lat,lon' and radius between 0 and {Config.GEO_MAX_RADIUS_KM} km"
+        }), 400
+    
+    query = db.session.query(Product.id, Product.updated_at, Product.latitude, Product.longitude).filter(*conditions)
+    matches = geo.nearby(query, lat, lon, radius, limit)
+    
+    fragments = _product_fragments(
+        [row for row, _ in matches],
+        {row.id: {'distance_km': round(distance, 2)} for row, distance in matches}
+    )
+    
+    return _fragment_response({
+        "success": True,
+        "count": len(fragments),
+        "limit": limit,
+        "near": {"latitude": lat, "longitude": lon, "radius_km": radius}
+    }, fragments), 200
+
+def _ranked_versions(product_ids):
+    """(id, updated_at) rows of the available products among ids from an index, in the index's rank order"""
+    if not product_ids:
+        return []
+    
+    by_id = {
+        row.id: row
+        for row in db.session.query(Product.id, Product.updated_at).filter(
+            Product.id.in_(product_ids),
+            Product.is_available == True
+        )
+    }
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+def _load_products(product_ids):
+    """Fragment cache loader: full products with their farmer joined in (one query)"""
+    return Product.query.options(joinedload(Product.farmer)).filter(Product.id.in_(product_ids)).all()
+
+def _viewer_id():
+    """The logged-in user's id, or None for anonymous visitors"""
+    return session.get('user_id') if session.get('logged_in') else None
+
+def _product_fragments(rows, extra_fields=None):
+    """
+    Cached fragments for rows, in row order, each with the viewer's
+    `available_quantity` (and any `extra_fields[id]`) spliced in
+    """
+    found = product_fragments.fragments_by_id(rows, _load_products)
+    available = available_quantities(list(found), _viewer_id()) if found else {}
+    return [
+        splice_fields(found[row.id], {
+            'available_quantity': available.get(row.id, 0),
+            **(extra_fields or {}).get(row.id, {})
+        })
+        for row in rows
+        if row.id in found
+    ]
+
+def _fragment_response(envelope, fragments):
+    """JSON response whose `products` array is spliced together from cached fragments"""
+    return current_app.response_class(splice_json(envelope, 'products', fragments), mimetype='application/json')
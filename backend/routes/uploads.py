@@ -0,0 +1,293 @@
+"""Resumable chunked upload routes (init, upload part, complete)"""
+from flask import Blueprint, jsonify, request, session
+from models import db, Upload
+from config import Config
+from storage import store_chunks, CHUNK_SIZE
+from images import schedule_variants
+from utils import allowed_file, ensure_directory_exists
+from datetime import datetime
+from uuid import uuid4
+import os
+import shutil
+
+uploads_bp = Blueprint('uploads', __name__, url_prefix='/api/uploads')
+
+PURPOSE_EXTENSIONS = {
+    'photo': Config.ALLOWED_IMAGE_EXTENSIONS,
+    'certification': {'pdf'}
+}
+
+def _staging_dir(upload_id):
+    return os.path.join(Config.UPLOAD_FOLDER, 'staging', upload_id)
+
+def _part_path(upload_id, part_number):
+    return os.path.join(_staging_dir(upload_id), f"{part_number}.part")
+
+def _received_parts(upload):
+    """Part numbers already on disk, i.e. what a resuming client can skip"""
+    if upload.status != 'pending':
+        return list(range(upload.part_count))
+    return [n for n in range(upload.part_count) if os.path.exists(_part_path(upload.id, n))]
+
+def _current_user_id():
+    return session.get('user_id') if session.get('logged_in') else None
+
+def _is_expired(upload):
+    return upload.status == 'pending' and upload.expires_at is not None and upload.expires_at <= datetime.utcnow()
+
+def _get_owned_upload(upload_id):
+    """
+    Look up an upload belonging to the caller (anonymous uploads belong to
+    anonymous callers). Lapsed unfinished uploads count as gone.
+    """
+    upload = Upload.query.get(upload_id)
+    if not upload or upload.user_id != _current_user_id() or _is_expired(upload):
+        return None
+    return upload
+
+def sweep_expired_uploads():
+    """
+    Delete unfinished uploads past their expiry, with their staging directories.
+    Run periodically by the background sweeper; returns the number removed.
+    """
+    expired = [
+        upload_id for (upload_id,) in db.session.query(Upload.id)
+        .filter(Upload.status == 'pending', Upload.expires_at <= datetime.utcnow())
+    ]
+    if not expired:
+        db.session.rollback()
+        return 0
+    
+    Upload.query.filter(Upload.id.in_(expired), Upload.status == 'pending') \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    
+    for upload_id in expired:
+        shutil.rmtree(_staging_dir(upload_id), ignore_errors=True)
+    return len(expired)
+
+def claim_upload(upload_id, purpose):
+    """
+    Attach a completed upload to a product or farmer application.
+    Returns its storage key, or None if the id is unknown, not the caller's,
+    not completed, already attached or for another purpose.
+    Marks it attached in the caller's transaction.
+    """
+    upload = _get_owned_upload(upload_id)
+    if not upload or upload.purpose != purpose or upload.status != 'completed':
+        return None
+    
+    upload.status = 'attached'
+    return upload.storage_key
+
+@uploads_bp.route("", methods=["POST"])
+def init_upload():
+    """Start a resumable upload; returns its id and the part size to use"""
+    try:
+        data = request.get_json() or {}
+        purpose = data.get('purpose')
+        filename = data.get('filename', '')
+        total_size = data.get('size')
+        user_id = _current_user_id()
+        
+        if purpose not in PURPOSE_EXTENSIONS:
+            return jsonify({
+                "error": "Invalid purpose",
+                "message": f"Purpose must be one of: {', '.join(PURPOSE_EXTENSIONS)}"
+            }), 400
+        
+        # Farmer applicants have no account yet, so only certifications may be uploaded anonymously
+        if purpose == 'photo' and (not user_id or session.get('user_type') != 'farmer'):
+            return jsonify({
+                "error": "Unauthorized",
+                "message": "Only logged-in farmers can upload product photos"
+            }), 403
+        
+        if not allowed_file(filename, PURPOSE_EXTENSIONS[purpose]):
+            return jsonify({
+                "error": "Invalid file type",
+                "message": f"Allowed types: {', '.join(sorted(PURPOSE_EXTENSIONS[purpose]))}"
+            }), 400
+        
+        if not isinstance(total_size, int) or total_size <= 0 or total_size > Config.CHUNKED_UPLOAD_MAX_SIZE:
+            return jsonify({
+                "error": "Invalid size",
+                "message": f"Size must be between 1 and {Config.CHUNKED_UPLOAD_MAX_SIZE} bytes"
+            }), 400
+        
+        now = datetime.utcnow()
+        if not user_id:
+            # Anyone can start a certification upload, so cap how much staging space one client can hold
+            pending = Upload.query.filter(
+                Upload.user_id.is_(None),
+                Upload.client_ip == request.remote_addr,
+                Upload.status == 'pending',
+                Upload.expires_at > now
+            ).count()
+            if pending >= Config.ANONYMOUS_PENDING_UPLOADS_MAX:
+                return jsonify({
+                    "error": "Too many uploads",
+                    "message": "Finish or wait for your unfinished uploads to expire before starting another"
+                }), 429
+        
+        upload = Upload(
+            id=uuid4().hex,
+            user_id=user_id,
+            purpose=purpose,
+            filename=filename,
+            total_size=total_size,
+            chunk_size=Config.UPLOAD_CHUNK_SIZE,
+            client_ip=request.remote_addr,
+            expires_at=now + Config.UPLOAD_PENDING_TTL
+        )
+        db.session.add(upload)
+        db.session.commit()
+        
+        ensure_directory_exists(_staging_dir(upload.id))
+        
+        return jsonify({
+            "success": True,
+            "upload": upload.to_dict(received_parts=[])
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to start upload",
+            "message": str(e)
+        }), 500
+
+@uploads_bp.route("/<string:upload_id>", methods=["GET"])
+def get_upload(upload_id):
+    """Upload status, including which parts have arrived (for resuming)"""
+    upload = _get_owned_upload(upload_id)
+    if not upload:
+        return jsonify({
+            "error": "Upload not found"
+        }), 404
+    
+    return jsonify({
+        "success": True,
+        "upload": upload.to_dict(received_parts=_received_parts(upload))
+    }), 200
+
+@uploads_bp.route("/<string:upload_id>/parts/<int:part_number>", methods=["PUT"])
+def upload_part(upload_id, part_number):
+    """Upload one part of a resumable upload as the raw request body"""
+    try:
+        upload = _get_owned_upload(upload_id)
+        if not upload:
+            return jsonify({
+                "error": "Upload not found"
+            }), 404
+        
+        if upload.status != 'pending':
+            return jsonify({
+                "error": "Upload already completed"
+            }), 409
+        
+        if part_number < 0 or part_number >= upload.part_count:
+            return jsonify({
+                "error": "Invalid part number",
+                "message": f"Part number must be between 0 and {upload.part_count - 1}"
+            }), 400
+        
+        expected = upload.part_size(part_number)
+        path = _part_path(upload.id, part_number)
+        temp_path = f"{path}.{uuid4().hex}.tmp"
+        ensure_directory_exists(os.path.dirname(path))
+        
+        written = 0
+        try:
+            with open(temp_path, 'wb') as out:
+                while written <= expected:
+                    chunk = request.stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    written += len(chunk)
+            
+            if written != expected:
+                return jsonify({
+                    "error": "Invalid part size",
+                    "message": f"Part {part_number} must be exactly {expected} bytes, got {written}"
+                }), 400
+            
+            # Only a complete part becomes visible, so an interrupted PUT is simply retried
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        # An upload that is still making progress doesn't expire
+        upload.expires_at = datetime.utcnow() + Config.UPLOAD_PENDING_TTL
+        db.session.commit()
+        
+        return jsonify({
+            "success": True,
+            "part_number": part_number,
+            "received_parts": len(_received_parts(upload)),
+            "part_count": upload.part_count
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to upload part",
+            "message": str(e)
+        }), 500
+
+@uploads_bp.route("/<string:upload_id>/complete", methods=["POST"])
+def complete_upload(upload_id):
+    """Assemble the parts into the content-addressed store once all have arrived"""
+    try:
+        upload = _get_owned_upload(upload_id)
+        if not upload:
+            return jsonify({
+                "error": "Upload not found"
+            }), 404
+        
+        if upload.status != 'pending':
+            return jsonify({
+                "success": True,
+                "upload": upload.to_dict(received_parts=_received_parts(upload))
+            }), 200
+        
+        received = _received_parts(upload)
+        if len(received) != upload.part_count:
+            missing = sorted(set(range(upload.part_count)) - set(received))
+            return jsonify({
+                "error": "Upload incomplete",
+                "message": f"{len(missing)} part(s) missing",
+                "missing_parts": missing
+            }), 409
+        
+        def read_parts():
+            for part_number in range(upload.part_count):
+                with open(_part_path(upload.id, part_number), 'rb') as part:
+                    yield from iter(lambda: part.read(CHUNK_SIZE), b'')
+        
+        ext = upload.filename.rsplit('.', 1)[1].lower()
+        storage_key, created = store_chunks(read_parts(), ext)
+        
+        upload.storage_key = storage_key
+        upload.status = 'completed'
+        upload.completed_at = datetime.utcnow()
+        upload.expires_at = None
+        db.session.commit()
+        
+        shutil.rmtree(_staging_dir(upload.id), ignore_errors=True)
+        if upload.purpose == 'photo' and created:
+            schedule_variants(storage_key)
+        
+        return jsonify({
+            "success": True,
+            "upload": upload.to_dict(received_parts=_received_parts(upload))
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to complete upload",
+            "message": str(e)
+        }), 500
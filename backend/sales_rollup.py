@@ -0,0 +1,72 @@
+"""Incrementally maintained daily sales rollup per farmer and product (sales_daily)"""
+from datetime import date, datetime
+from sqlalchemy import delete, distinct, func, select
+from sqlalchemy.dialects.sqlite import insert
+from models import db, Order, OrderItem, Product, SalesDaily
+
+def record_sales(day: date, lines):
+    """
+    Add one order's lines to the rollup. `lines` are (farmer_id, product_id,
+    units, revenue) tuples with one entry per product. All lines are upserted
+    by a single INSERT ... ON CONFLICT; nothing is committed here, so an order
+    that fails later never shows up in the rollup.
+    """
+    now = datetime.utcnow()
+    rows = [{
+        'farmer_id': farmer_id,
+        'day': day,
+        'product_id': product_id,
+        'units': units,
+        'revenue': revenue,
+        'order_count': 1,
+        'updated_at': now
+    } for farmer_id, product_id, units, revenue in lines]
+    if not rows:
+        return
+    
+    table = SalesDaily.__table__
+    stmt = insert(table).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.farmer_id, table.c.day, table.c.product_id],
+        set_={
+            'units': table.c.units + stmt.excluded.units,
+            'revenue': table.c.revenue + stmt.excluded.revenue,
+            'order_count': table.c.order_count + stmt.excluded.order_count,
+            'updated_at': now
+        }
+    ))
+
+def rebuild_sales_daily(farmer_id: int = None) -> int:
+    """
+    Recompute the rollup from orders and order_items with one grouped
+    INSERT ... SELECT, for one farmer or (by default) all of them. Cancelled
+    orders are left out. Returns the number of rollup rows written; the
+    caller commits.
+    """
+    table = SalesDaily.__table__
+    
+    source = select(
+        Product.farmer_id,
+        func.date(Order.created_at),
+        OrderItem.product_id,
+        func.sum(OrderItem.quantity),
+        func.sum(OrderItem.quantity * OrderItem.price),
+        func.count(distinct(Order.id)),
+        func.max(Order.created_at)
+    ).select_from(OrderItem) \
+        .join(Order, Order.id == OrderItem.order_id) \
+        .join(Product, Product.id == OrderItem.product_id) \
+        .where(Order.status != 'cancelled') \
+        .group_by(Product.farmer_id, func.date(Order.created_at), OrderItem.product_id)
+    
+    clear = delete(table)
+    if farmer_id is not None:
+        source = source.where(Product.farmer_id == farmer_id)
+        clear = clear.where(table.c.farmer_id == farmer_id)
+    
+    db.session.execute(clear)
+    result = db.session.execute(insert(table).from_select(
+        ['farmer_id', 'day', 'product_id', 'units', 'revenue', 'order_count', 'updated_at'],
+        source
+    ))
+    return result.rowcount
@@ -0,0 +1,110 @@
+"""Full-text product search backed by an SQLite FTS5 index"""
+import re
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from models import db
+
+FTS_TABLE = 'products_fts'
+
+# bm25() column weights: a hit in the name outranks category, which outranks description
+BM25_RANK = 'bm25(10.0, 5.0, 1.0)'
+
+_TERM_RE = re.compile(r'(\w+)(\*?)', re.UNICODE)
+
+# Set by init_search_index(); False means FTS5 is unavailable and callers should fall back
+fts_enabled = False
+
+# The index mirrors only available products, so sold-out rows drop out of
+# search results as soon as `is_available` flips and never cost a MATCH.
+_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products
+    WHEN new.is_available BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, category, description)
+        VALUES (new.id, new.name, new.category, new.description);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products
+    WHEN old.is_available BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category, description)
+        VALUES ('delete', old.id, old.name, old.category, old.description);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_fts_au
+    AFTER UPDATE OF name, category, description, is_available ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category, description)
+        SELECT 'delete', old.id, old.name, old.category, old.description WHERE old.is_available;
+        INSERT INTO {FTS_TABLE}(rowid, name, category, description)
+        SELECT new.id, new.name, new.category, new.description WHERE new.is_available;
+    END
+    ''',
+]
+
+def init_search_index(engine) -> bool:
+    """
+    Create the FTS5 table and its sync triggers if missing, populating it from
+    existing available products on first creation. Returns whether FTS5 is usable.
+    """
+    global fts_enabled
+    
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first()
+            
+            if not exists:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                    "name, category, description, "
+                    "content='products', content_rowid='id', "
+                    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                ))
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', :rank)"),
+                             {'rank': BM25_RANK})
+                conn.execute(text(
+                    f"INSERT INTO {FTS_TABLE}(rowid, name, category, description) "
+                    "SELECT id, name, category, description FROM products WHERE is_available"
+                ))
+                print(f"✓ Created {FTS_TABLE} full-text index")
+            
+            for trigger in _TRIGGERS:
+                conn.execute(text(trigger))
+        
+        fts_enabled = True
+    except OperationalError as e:
+        print(f"Full-text search unavailable, falling back to LIKE search: {e}")
+        fts_enabled = False
+    
+    return fts_enabled
+
+def build_match_query(user_query: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+    Every term is quoted (so FTS5 operators in user input are inert) and must match;
+    a trailing `*` makes a term a prefix, and the last term is always a prefix
+    so results keep up while the user is still typing.
+    """
+    terms = _TERM_RE.findall(user_query.lower())
+    
+    parts = []
+    for i, (word, star) in enumerate(terms):
+        is_prefix = bool(star) or i == len(terms) - 1
+        parts.append(f'"{word}"*' if is_prefix else f'"{word}"')
+    
+    return ' '.join(parts)
+
+def search_product_ids(user_query: str, limit: int) -> list:
+    """Return ids of available products matching the query, best BM25 rank first"""
+    match = build_match_query(user_query)
+    if not match:
+        return []
+    
+    rows = db.session.execute(
+        text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY rank LIMIT :limit"),
+        {'match': match, 'limit': limit}
+    )
+    return [row[0] for row in rows]
@@ -0,0 +1,61 @@
+"""Content-addressed file store for uploads (product photos, certifications)"""
+import hashlib
+import os
+import re
+from uuid import uuid4
+from config import Config
+from utils import ensure_directory_exists
+
+# Objects live under UPLOAD_FOLDER so existing send_from_directory calls can serve them
+OBJECTS_DIR = 'objects'
+CHUNK_SIZE = 64 * 1024
+
+_KEY_RE = re.compile(r'^objects/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$')
+_NAME_RE = re.compile(r'^([0-9a-f]{64})\.([a-z0-9]+)$')
+
+def object_key(digest: str, ext: str) -> str:
+    """Storage key (path relative to UPLOAD_FOLDER) of an object: objects/ab/cd/abcd....ext"""
+    return f"{OBJECTS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+def is_object_key(name: str) -> bool:
+    """True for content-addressed keys; legacy uploads are bare uuid filenames"""
+    return bool(name) and bool(_KEY_RE.match(name))
+
+def key_from_name(name: str) -> str:
+    """Map a public object name ('<sha256>.<ext>') back to its key, or None if malformed"""
+    match = _NAME_RE.match(name or '')
+    return object_key(match.group(1), match.group(2)) if match else None
+
+def store_chunks(chunks, ext: str) -> tuple:
+    """
+    Write an iterable of byte chunks into the store, hashing as it streams.
+    Content that is already stored is not written twice.
+    Returns (key, created) where created is False for a duplicate.
+    """
+    temp_dir = os.path.join(Config.UPLOAD_FOLDER, OBJECTS_DIR, 'tmp')
+    ensure_directory_exists(temp_dir)
+    temp_path = os.path.join(temp_dir, uuid4().hex)
+    
+    digest = hashlib.sha256()
+    try:
+        with open(temp_path, 'wb') as out:
+            for chunk in chunks:
+                digest.update(chunk)
+                out.write(chunk)
+        
+        key = object_key(digest.hexdigest(), ext.lower())
+        path = os.path.join(Config.UPLOAD_FOLDER, key)
+        if os.path.exists(path):
+            return key, False
+        
+        ensure_directory_exists(os.path.dirname(path))
+        os.replace(temp_path, path)
+        return key, True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def store_file(file_storage, ext: str) -> tuple:
+    """Store an uploaded werkzeug FileStorage; see store_chunks()"""
+    stream = file_storage.stream
+    return store_chunks(iter(lambda: stream.read(CHUNK_SIZE), b''), ext)
@@ -0,0 +1,134 @@
+"""In-memory typeahead index over product names and categories"""
+import bisect
+import heapq
+import re
+import threading
+from sqlalchemy import func
+from models import db, Product, OrderItem
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Sold-out products still suggest (buyers look for them) but rank well below live stock
+UNAVAILABLE_WEIGHT = 0.1
+
+# Upper bound on index entries visited per lookup, so a one-letter prefix stays cheap
+MAX_SCAN = 2000
+
+def _normalize(value: str) -> str:
+    return ' '.join(_WORD_RE.findall((value or '').lower()))
+
+def _index_keys(value: str) -> list:
+    """Every word-suffix of the phrase, so 'tom' and 'organic tom' both hit 'Organic Tomatoes'"""
+    words = _normalize(value).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+class SuggestionIndex:
+    """
+    Sorted-array prefix index. Keys are kept in a sorted list of
+    (key, kind, product_id) tuples, so a prefix lookup is a bisect followed by
+    a short range scan and never touches the database.
+    """
+    
+    def __init__(self):
+        self._entries = []
+        self._products = {}  # product_id -> {'name', 'category', 'available', 'popularity'}
+        self._lock = threading.Lock()
+    
+    def build(self):
+        """(Re)build the index from the database: one products query and one popularity query"""
+        popularity = dict(
+            db.session.query(OrderItem.product_id, func.count(OrderItem.id)).group_by(OrderItem.product_id)
+        )
+        rows = db.session.query(Product.id, Product.name, Product.category, Product.is_available)
+        
+        products = {}
+        entries = []
+        for product_id, name, category, is_available in rows:
+            products[product_id] = {
+                'name': name,
+                'category': category,
+                'available': bool(is_available),
+                'popularity': popularity.get(product_id, 0)
+            }
+            entries.extend(self._entries_for(product_id, name, category))
+        entries.sort()
+        
+        with self._lock:
+            self._entries = entries
+            self._products = products
+    
+    def add_product(self, product):
+        """Index a newly created (or changed) product"""
+        with self._lock:
+            previous = self._products.get(product.id)
+            if previous:
+                self._remove_entries(product.id, previous['name'], previous['category'])
+            
+            self._products[product.id] = {
+                'name': product.name,
+                'category': product.category,
+                'available': bool(product.is_available),
+                'popularity': previous['popularity'] if previous else 0
+            }
+            for entry in self._entries_for(product.id, product.name, product.category):
+                bisect.insort(self._entries, entry)
+    
+    def set_available(self, product_id: int, available: bool):
+        """Re-weight a product whose availability changed; its keys stay in place"""
+        with self._lock:
+            if product_id in self._products:
+                self._products[product_id]['available'] = available
+    
+    def record_order(self, product_id: int):
+        """Bump a product's popularity after it appears in an order"""
+        with self._lock:
+            if product_id in self._products:
+                self._products[product_id]['popularity'] += 1
+    
+    def suggest(self, prefix: str, limit: int) -> list:
+        """Return up to `limit` suggestions for the prefix, heaviest first"""
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        
+        scores = {}
+        seen = set()
+        with self._lock:
+            start = bisect.bisect_left(self._entries, (prefix,))
+            for key, kind, product_id in self._entries[start:start + MAX_SCAN]:
+                if not key.startswith(prefix):
+                    break
+                # A product can match through several suffixes; count it once per kind
+                if (kind, product_id) in seen:
+                    continue
+                seen.add((kind, product_id))
+                
+                product = self._products[product_id]
+                weight = (1 + product['popularity']) * (1.0 if product['available'] else UNAVAILABLE_WEIGHT)
+                
+                if kind == 'product':
+                    suggestion = ('product', product['name'], product_id)
+                else:
+                    suggestion = ('category', product['category'], None)
+                scores[suggestion] = scores.get(suggestion, 0) + weight
+        
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {'type': kind, 'text': text, 'product_id': product_id, 'score': round(score, 2)}
+            for (kind, text, product_id), score in best
+        ]
+    
+    @staticmethod
+    def _entries_for(product_id, name, category):
+        entries = [(key, 'product', product_id) for key in _index_keys(name)]
+        entries.extend((key, 'category', product_id) for key in _index_keys(category))
+        return entries
+    
+    def _remove_entries(self, product_id, name, category):
+        for entry in self._entries_for(product_id, name, category):
+            i = bisect.bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+# Typeahead index queried by /api/products/suggest
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,120 @@
+"""
+Checkout tests through the order and cart endpoints: concurrent orders never
+oversell, cart holds keep stock from other buyers, and idempotent retries replay.
+Runs against a throwaway SQLite database; use `python -m pytest test_checkout.py`
+or run this file directly.
+"""
+import threading
+from testing_db import use_temp_database
+
+# Point the app at a temporary database before it is imported
+use_temp_database()
+
+from app import app
+from models import db, User, Product, Order
+
+def _seed(prefix, quantity, buyers=1):
+    """Create a farmer with one product and `buyers` buyers; returns (product_id, [buyer_ids])"""
+    with app.app_context():
+        farmer = User(username=f'{prefix}_farmer', email=f'{prefix}_farmer@test.com', user_type='farmer')
+        farmer.set_password('password')
+        users = []
+        for i in range(buyers):
+            buyer = User(username=f'{prefix}_buyer_{i}', email=f'{prefix}_buyer_{i}@test.com', user_type='user')
+            buyer.set_password('password')
+            users.append(buyer)
+        db.session.add_all([farmer, *users])
+        db.session.flush()
+        
+        product = Product(farmer_id=farmer.id, name=f'{prefix} carrots', price=2.0, quantity=quantity, unit='kg')
+        db.session.add(product)
+        db.session.commit()
+        return product.id, [user.id for user in users]
+
+def _client(user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['user_id'] = user_id
+        sess['user_type'] = 'user'
+    return client
+
+def _stock(product_id):
+    with app.app_context():
+        product = db.session.get(Product, product_id)
+        return product.quantity, product.is_available
+
+def _order_count(user_ids):
+    with app.app_context():
+        return Order.query.filter(Order.user_id.in_(user_ids)).count()
+
+def test_concurrent_orders_never_oversell():
+    product_id, buyer_ids = _seed('co_race', quantity=5, buyers=12)
+    clients = [_client(buyer_id) for buyer_id in buyer_ids]
+    statuses = []
+    start = threading.Barrier(len(clients))
+    
+    def checkout(client):
+        start.wait()
+        response = client.post('/api/orders', json={'items': [{'id': product_id, 'quantity': 1}]})
+        statuses.append(response.status_code)
+    
+    threads = [threading.Thread(target=checkout, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    sold = statuses.count(201)
+    assert sold == 5, statuses
+    assert all(status in (201, 400) for status in statuses), statuses
+    assert _stock(product_id) == (0, False)
+    assert _order_count(buyer_ids) == sold
+
+def test_cart_hold_excludes_other_buyers():
+    product_id, (holder_id, other_id) = _seed('co_hold', quantity=10, buyers=2)
+    holder, other = _client(holder_id), _client(other_id)
+    
+    assert holder.put(f'/api/cart/items/{product_id}', json={'quantity': 8}).status_code == 200
+    
+    # The other buyer sees and can hold only what is left
+    assert other.get(f'/api/products/{product_id}').get_json()['product']['available_quantity'] == 2
+    response = other.put(f'/api/cart/items/{product_id}', json={'quantity': 3})
+    assert response.status_code == 409
+    assert response.get_json()['available'] == 2
+    assert other.post('/api/orders', json={'items': [{'id': product_id, 'quantity': 3}]}).status_code == 400
+    
+    # The holder can still raise their own hold up to the stock
+    assert holder.get(f'/api/products/{product_id}').get_json()['product']['available_quantity'] == 10
+    
+    assert other.post('/api/orders', json={'items': [{'id': product_id, 'quantity': 2}]}).status_code == 201
+    assert holder.post('/api/orders', json={'items': [{'id': product_id, 'quantity': 8}]}).status_code == 201
+    assert _stock(product_id) == (0, False)
+    assert holder.get('/api/cart').get_json()['cart']['items'] == []
+
+def test_idempotent_order_is_replayed():
+    product_id, (buyer_id,) = _seed('co_idem', quantity=10)
+    client = _client(buyer_id)
+    headers = {'Idempotency-Key': 'co-idem-checkout-1'}
+    body = {'items': [{'id': product_id, 'quantity': 3}]}
+    
+    first = client.post('/api/orders', json=body, headers=headers)
+    retry = client.post('/api/orders', json=body, headers=headers)
+    
+    assert first.status_code == 201
+    assert retry.status_code == 201
+    assert retry.headers.get('Idempotent-Replayed') == 'true'
+    assert retry.get_json() == first.get_json()
+    assert _order_count([buyer_id]) == 1
+    assert _stock(product_id) == (7, True)
+    
+    # The same key with a different body is refused rather than replayed
+    changed = client.post('/api/orders', json={'items': [{'id': product_id, 'quantity': 4}]}, headers=headers)
+    assert changed.status_code == 422
+    assert _order_count([buyer_id]) == 1
+
+if __name__ == "__main__":
+    test_concurrent_orders_never_oversell()
+    test_cart_hold_excludes_other_buyers()
+    test_idempotent_order_is_replayed()
+    print("Checkout tests passed")
@@ -0,0 +1,76 @@
+"""
+Query-count regression test for the product detail endpoint.
+Runs against a throwaway SQLite database; use `python -m pytest test_product_detail_queries.py`
+or run this file directly.
+"""
+from testing_db import use_temp_database
+
+# Point the app at a temporary database before it is imported
+use_temp_database()
+
+from sqlalchemy import event
+from app import app
+from models import db, User, Product, FarmerRating
+from rating_stats import record_rating
+
+# One lookup of the collection versions for the ETag, one for the product, farmer and rating stats,
+# one for the stock held in other buyers' carts
+EXPECTED_QUERIES = 3
+
+def _seed():
+    """Create a farmer with three ratings and one available product; returns the product id"""
+    with app.app_context():
+        farmer = User(username='qc_farmer', email='qc_farmer@test.com', user_type='farmer')
+        farmer.set_password('password')
+        db.session.add(farmer)
+        
+        raters = []
+        for i in range(3):
+            rater = User(username=f'qc_rater_{i}', email=f'qc_rater_{i}@test.com', user_type='user')
+            rater.set_password('password')
+            raters.append(rater)
+        db.session.add_all(raters)
+        db.session.flush()
+        
+        for rater, stars in zip(raters, (5, 4, 3)):
+            db.session.add(FarmerRating(farmer_id=farmer.id, user_id=rater.id, rating=stars))
+            db.session.flush()
+            record_rating(farmer.id, stars)
+        
+        product = Product(farmer_id=farmer.id, name='Query Count Tomatoes', price=2.5, quantity=10, unit='kg')
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+def _count_queries(fn):
+    """Run fn() and return (its result, the SQL statements it executed)"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return result, statements
+
+def test_product_detail_query_count():
+    product_id = _seed()
+    client = app.test_client()
+    
+    response, statements = _count_queries(lambda: client.get(f'/api/products/{product_id}'))
+    
+    assert response.status_code == 200
+    farmer = response.get_json()['product']['farmer']
+    assert farmer['username'] == 'qc_farmer'
+    assert farmer['average_rating'] == 4.0
+    assert farmer['rating_count'] == 3
+    assert len(statements) == EXPECTED_QUERIES, "\n\n".join(statements)
+
+if __name__ == "__main__":
+    test_product_detail_query_count()
+    print(f"Product detail ran in {EXPECTED_QUERIES} queries")
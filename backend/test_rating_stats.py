@@ -0,0 +1,71 @@
+"""
+Tests for the incrementally maintained farmer rating stats, through the rating endpoint.
+Runs against a throwaway SQLite database; use `python -m pytest test_rating_stats.py`
+or run this file directly.
+"""
+from testing_db import use_temp_database
+
+# Point the app at a temporary database before it is imported
+use_temp_database()
+
+from app import app
+from models import db, User, FarmerRating, FarmerRatingStats
+
+def _create_users(prefix, raters=1):
+    """Create a farmer and `raters` buyers; returns (farmer_id, [rater_ids])"""
+    with app.app_context():
+        farmer = User(username=f'{prefix}_farmer', email=f'{prefix}_farmer@test.com', user_type='farmer')
+        farmer.set_password('password')
+        users = [farmer]
+        for i in range(raters):
+            rater = User(username=f'{prefix}_rater_{i}', email=f'{prefix}_rater_{i}@test.com', user_type='user')
+            rater.set_password('password')
+            users.append(rater)
+        db.session.add_all(users)
+        db.session.commit()
+        return farmer.id, [user.id for user in users[1:]]
+
+def _rate(user_id, farmer_id, rating):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['user_id'] = user_id
+        sess['user_type'] = 'user'
+    return client.post(f'/api/farmers/{farmer_id}/rate', json={'rating': rating})
+
+def _stats(farmer_id):
+    with app.app_context():
+        stats = db.session.get(FarmerRatingStats, farmer_id)
+        return stats and (stats.rating_count, stats.rating_sum, stats.distribution())
+
+def test_first_rating_creates_stats():
+    farmer_id, (rater_id,) = _create_users('rs_first')
+    assert _stats(farmer_id) is None
+    
+    assert _rate(rater_id, farmer_id, 4).status_code == 201
+    
+    assert _stats(farmer_id) == (1, 4, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0})
+
+def test_rerate_without_stats_row():
+    farmer_id, rater_ids = _create_users('rs_rerate', raters=2)
+    # Ratings written before the stats table existed: no stats row for the farmer
+    with app.app_context():
+        db.session.add_all([
+            FarmerRating(farmer_id=farmer_id, user_id=rater_ids[0], rating=2),
+            FarmerRating(farmer_id=farmer_id, user_id=rater_ids[1], rating=5)
+        ])
+        db.session.commit()
+    assert _stats(farmer_id) is None
+    
+    assert _rate(rater_ids[0], farmer_id, 3).status_code == 200
+    
+    assert _stats(farmer_id) == (2, 8, {1: 0, 2: 0, 3: 1, 4: 0, 5: 1})
+    
+    # With the row in place, later changes are applied as deltas
+    assert _rate(rater_ids[1], farmer_id, 1).status_code == 200
+    assert _stats(farmer_id) == (2, 4, {1: 1, 2: 0, 3: 1, 4: 0, 5: 0})
+
+if __name__ == "__main__":
+    test_first_rating_creates_stats()
+    test_rerate_without_stats_row()
+    print("Rating stats tests passed")
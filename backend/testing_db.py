@@ -0,0 +1,18 @@
+"""Shared setup for the backend tests: a throwaway SQLite database and no background threads"""
+import os
+import sys
+import tempfile
+
+_db_dir = None
+
+def use_temp_database():
+    """
+    Point the app at a temporary database. Call it before importing `app`, which
+    creates the schema on import; test files run in one process share the database.
+    """
+    global _db_dir
+    if _db_dir is None:
+        _db_dir = tempfile.mkdtemp()
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+        os.environ['BACKGROUND_TASKS'] = '0'
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
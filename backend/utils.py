@@ -1,17 +1,14 @@
 """Utility functions for the application"""
 import os
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
 from werkzeug.utils import secure_filename
-from uuid import uuid4
 
 def allowed_file(filename: str, allowed_extensions: set) -> bool:
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def generate_unique_filename(original_filename: str) -> str:
-    """Generate a unique filename for uploaded files"""
-    file_ext = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
-    return f"{uuid4().hex}.{file_ext}"
-
 def get_mime_type(filename: str) -> str:
     """Get MIME type based on file extension"""
     file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
@@ -29,3 +26,46 @@ def ensure_directory_exists(directory: str) -> None:
     """Create directory if it doesn't exist"""
     os.makedirs(directory, exist_ok=True)
 
+
+def parse_limit(value, default: int, maximum: int) -> int:
+    """Parse a `limit` query parameter, falling back to the default and capping at maximum"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque pagination cursor"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a pagination cursor into (created_at, id). Raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def keyset_paginate(query, model, cursor: str, limit: int) -> tuple:
+    """
+    Return one page of `query` ordered newest first on (created_at, id).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < last_id)
+        ))
+    
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    
+    return rows, next_cursor
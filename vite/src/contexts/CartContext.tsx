@@ -5,6 +5,8 @@ import React, {
   useEffect,
   ReactNode,
 } from "react";
+import { useAuth } from "./AuthContext";
+import { cartAPI } from "../services/api";
 
 interface CartItem {
   id: number;
@@ -38,11 +40,29 @@ export const CartProvider: React.FC<{ children: ReactNode }> = ({
     return savedCart ? JSON.parse(savedCart) : [];
   });
 
+  const { user } = useAuth();
+
   // Save cart to localStorage whenever it changes
   useEffect(() => {
     localStorage.setItem("cart", JSON.stringify(cart));
   }, [cart]);
 
+  // Mirror the cart to the server for logged-in users so its items are held in stock
+  useEffect(() => {
+    if (!user) return;
+    const timer = setTimeout(() => {
+      cartAPI
+        .replace(cart.map((item) => ({ id: item.id, quantity: item.quantity })))
+        .then((result) => {
+          if (result.unavailable && result.unavailable.length > 0) {
+            console.warn("Some cart items could not be reserved:", result.unavailable);
+          }
+        })
+        .catch((err) => console.error("Failed to sync cart:", err));
+    }, 500);
+    return () => clearTimeout(timer);
+  }, [cart, user]);
+
   const addToCart = (product: any) => {
     setCart((prevCart) => {
       const existingItem = prevCart.find((item) => item.id === product.id);
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { useCart } from '../contexts/CartContext';
 import { orderAPI } from '../services/order';
@@ -10,13 +10,24 @@ export const Cart = () => {
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState('');
     const [success, setSuccess] = useState(false);
+    // One key per checkout: retrying the same cart reuses it, so a timed-out request is never placed twice
+    const checkoutKey = useRef<string | null>(null);
+
+    useEffect(() => {
+        checkoutKey.current = null;
+    }, [cart]);
 
     const handleCheckout = async () => {
         setLoading(true);
         setError('');
 
+        if (!checkoutKey.current) {
+            checkoutKey.current = crypto.randomUUID();
+        }
+
         try {
-            await orderAPI.create(cart);
+            await orderAPI.create(cart, checkoutKey.current);
+            checkoutKey.current = null;
             setSuccess(true);
             clearCart();
             // Optional: Redirect after a delay
@@ -92,7 +103,7 @@ export const Cart = () => {
                         <div key={item.id} className="bg-white rounded-lg shadow-md p-4 flex gap-4">
                             {item.photo_url ? (
                                 <img
-                                    src={`http://localhost:5000${item.photo_url}`}
+                                    src={`http://localhost:5000${item.photo_url}?size=thumb`}
                                     alt={item.name}
                                     className="w-24 h-24 object-cover rounded-md"
                                 />
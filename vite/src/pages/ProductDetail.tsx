@@ -46,7 +46,8 @@ export const ProductDetail = () => {
       if (result.product.farmer_id) {
         try {
           const ratingResult = await ratingAPI.getRating(
-            result.product.farmer_id
+            result.product.farmer_id,
+            "summary"
           );
           setFarmerRating(ratingResult);
         } catch (err) {
@@ -158,7 +159,7 @@ export const ProductDetail = () => {
   }
 
   const imageUrl = product.photo_url
-    ? `http://localhost:5000${product.photo_url}`
+    ? `http://localhost:5000${product.photo_url}?size=full`
     : null;
 
   return (
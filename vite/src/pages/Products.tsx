@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 import { productAPI } from "../services/api";
 import { Search, Package, Plus } from "lucide-react";
@@ -10,6 +10,27 @@ export const Products = () => {
   const [products, setProducts] = useState<any[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  const [suggestions, setSuggestions] = useState<string[]>([]);
+
+  // Typeahead: ask the lightweight suggest endpoint instead of running a full search per keystroke
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSuggestions([]);
+      return;
+    }
+
+    const timer = setTimeout(() => {
+      productAPI
+        .suggest(query)
+        .then((result) =>
+          setSuggestions(result.suggestions.map((suggestion) => suggestion.text))
+        )
+        .catch(() => setSuggestions([]));
+    }, 150);
+
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
 
   const handleSearch = async () => {
     if (!searchQuery.trim()) {
@@ -68,9 +89,15 @@ export const Products = () => {
               value={searchQuery}
               onChange={(e) => setSearchQuery(e.target.value)}
               onKeyPress={handleKeyPress}
+              list="product-suggestions"
               placeholder="Search for products..."
               className="w-full pl-10 pr-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-green-700 focus:border-transparent"
             />
+            <datalist id="product-suggestions">
+              {suggestions.map((suggestion) => (
+                <option key={suggestion} value={suggestion} />
+              ))}
+            </datalist>
           </div>
           <button
             onClick={handleSearch}
@@ -117,7 +144,7 @@ export const Products = () => {
           }) => {
             const [imageError, setImageError] = useState(false);
             const imageUrl = photoUrl
-              ? `http://localhost:5000${photoUrl}`
+              ? `http://localhost:5000${photoUrl}?size=card`
               : null;
 
             if (!imageUrl || imageError) {
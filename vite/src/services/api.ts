@@ -227,6 +227,21 @@ export const productAPI = {
     }>(`/api/products/${productId}`);
   },
 
+  suggest: async (query: string, limit = 8) => {
+    return apiCall<{
+      success: boolean;
+      query: string;
+      suggestions: {
+        type: "product" | "category";
+        text: string;
+        product_id: number | null;
+        score: number;
+      }[];
+    }>(
+      `/api/products/suggest?q=${encodeURIComponent(query)}&limit=${limit}`
+    );
+  },
+
   search: async (query: string) => {
     return apiCall<{
       success: boolean;
@@ -239,7 +254,13 @@ export const productAPI = {
 
 // Farmer Rating APIs
 export const ratingAPI = {
-  getRating: async (farmerId: number) => {
+  getRating: async (
+    farmerId: number,
+    mode: "full" | "summary" = "full",
+    cursor?: string
+  ) => {
+    const params = new URLSearchParams({ mode });
+    if (cursor) params.set("cursor", cursor);
     return apiCall<{
       success: boolean;
       farmer_id: number;
@@ -248,8 +269,28 @@ export const ratingAPI = {
       total_ratings: number;
       rating_distribution: Record<number, number>;
       user_rating: any | null;
-      ratings: any[];
-    }>(`/api/farmers/${farmerId}/rating`);
+      ratings?: any[];
+      next_cursor?: string | null;
+      has_more?: boolean;
+    }>(`/api/farmers/${farmerId}/rating?${params}`);
+  },
+
+  getSummaries: async (farmerIds: number[]) => {
+    return apiCall<{
+      success: boolean;
+      count: number;
+      ratings: Record<
+        number,
+        {
+          farmer_id: number;
+          farmer_username: string;
+          average_rating: number | null;
+          total_ratings: number;
+          rating_distribution: Record<number, number>;
+        }
+      >;
+      not_found: number[];
+    }>(`/api/farmers/ratings?ids=${farmerIds.join(",")}`);
   },
 
   rateFarmer: async (farmerId: number, rating: number, comment?: string) => {
@@ -264,6 +305,58 @@ export const ratingAPI = {
   },
 };
 
+// Server-side cart APIs (each line holds stock for a limited time)
+export interface CartResponse {
+  success: boolean;
+  cart: {
+    items: {
+      product_id: number;
+      name: string;
+      price: number;
+      unit: string;
+      photo_url: string | null;
+      farmer_id: number;
+      farmer_username: string | null;
+      quantity: number;
+      available_quantity: number;
+      expires_at: string;
+    }[];
+    total: number;
+    expires_at: string | null;
+  };
+  unavailable?: { product_id: number; requested: number; available: number }[];
+}
+
+export const cartAPI = {
+  get: async () => {
+    return apiCall<CartResponse>("/api/cart");
+  },
+
+  replace: async (items: { id: number; quantity: number }[]) => {
+    return apiCall<CartResponse>("/api/cart", {
+      method: "PUT",
+      body: JSON.stringify({ items }),
+    });
+  },
+
+  setItem: async (productId: number, quantity: number) => {
+    return apiCall<CartResponse>(`/api/cart/items/${productId}`, {
+      method: "PUT",
+      body: JSON.stringify({ quantity }),
+    });
+  },
+
+  removeItem: async (productId: number) => {
+    return apiCall<CartResponse>(`/api/cart/items/${productId}`, {
+      method: "DELETE",
+    });
+  },
+
+  clear: async () => {
+    return apiCall<CartResponse>("/api/cart", { method: "DELETE" });
+  },
+};
+
 // Seller APIs
 export const sellerAPI = {
   getAll: async (status?: string) => {
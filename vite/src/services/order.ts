@@ -11,18 +11,22 @@ const api = axios.create({
 });
 
 export const orderAPI = {
-    create: async (items: any[]) => {
+    // Pass the same idempotencyKey when retrying a checkout so the server never creates it twice
+    create: async (items: any[], idempotencyKey?: string) => {
         try {
-            const response = await api.post('/orders', { items });
+            const response = await api.post('/orders', { items }, {
+                headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+            });
             return response.data;
         } catch (error: any) {
             throw new Error(error.response?.data?.message || 'Failed to create order');
         }
     },
 
-    getAll: async () => {
+    // Order history is paginated: pass the previous page's next_cursor to get the next one
+    getAll: async (mode: 'full' | 'summary' = 'full', cursor?: string) => {
         try {
-            const response = await api.get('/orders');
+            const response = await api.get('/orders', { params: cursor ? { mode, cursor } : { mode } });
             return response.data;
         } catch (error: any) {
             throw new Error(error.response?.data?.message || 'Failed to fetch orders');